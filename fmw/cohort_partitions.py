@@ -0,0 +1,215 @@
+import pandas as pd
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import Config
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Configuración del logger
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+class CohortPartitionStore:
+    """
+    Exportación de alumnos particionada por cohorte.
+
+    Cada cohorte se guarda en <folder>/cohorte=<año>.csv y un manifest.json registra
+    cuándo se escribió cada partición y cuántos estudiantes activos tenía. Una
+    cohorte es cerrada si es anterior a Config.MIN_COHORTE y ni su partición ni la
+    descarga actual tienen estudiantes en Config.ESTADOS_ACTIVOS (Regular, Egresado,
+    ...), que todavía pueden cambiar de estado. Las cohortes cerradas se tratan como
+    inmutables: si su partición no supera Config.CLOSED_COHORTE_TTL_DAYS se
+    reutiliza en vez de la versión recién descargada, de modo que no aparecen en el
+    delta ni se reprocesan. Las demás cohortes se reescriben en paralelo en cada
+    ejecución.
+
+    Attributes:
+        folder (str): Carpeta de las particiones
+        min_cohorte (int): Primera cohorte activa
+        ttl (timedelta): Antigüedad máxima de una partición cerrada
+        refresh_closed (bool): Fuerza la actualización de las cohortes cerradas
+    """
+    SIN_COHORTE = 0
+
+    def __init__(self, folder: str = Config.EXPORT_PARTITIONS_FOLDER):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.folder = folder
+        self.manifest_path = os.path.join(folder, 'manifest.json')
+        self.min_cohorte = Config.MIN_COHORTE
+        self.estados_activos = Config.ESTADOS_ACTIVOS
+        self.ttl = timedelta(days=Config.CLOSED_COHORTE_TTL_DAYS)
+        self.refresh_closed = Config.REFRESH_CLOSED_COHORTES
+        os.makedirs(folder, exist_ok=True)
+        self.manifest: Dict[str, Dict] = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    @classmethod
+    def cohorte_series(cls, df: pd.DataFrame) -> pd.Series:
+        """Cohorte de cada fila de la exportación, a partir del año de 'Semestre Ingreso'"""
+        return pd.to_numeric(
+            df['Semestre Ingreso'].astype(str).str.extract(r'(\d{4})')[0], errors='coerce'
+        ).fillna(cls.SIN_COHORTE).astype(int)
+
+    def partition_path(self, cohorte: int) -> str:
+        return os.path.join(self.folder, f"cohorte={cohorte}.csv")
+
+    def activos(self, df: pd.DataFrame) -> int:
+        return int(df['Estado del Plan'].isin(self.estados_activos).sum())
+
+    def is_closed(self, cohorte: int, df: pd.DataFrame) -> bool:
+        """Cohorte antigua sin estudiantes activos, ni en la descarga ni en la partición guardada"""
+        if cohorte == self.SIN_COHORTE or cohorte >= self.min_cohorte:
+            return False
+        entrada = self.manifest.get(str(cohorte), {})
+        # Las entradas sin conteo de activos son de una versión anterior y se reescriben
+        return entrada.get('activos', 1) == 0 and self.activos(df) == 0
+
+    def is_fresh(self, cohorte: int) -> bool:
+        entrada = self.manifest.get(str(cohorte))
+        if not entrada or not os.path.exists(self.partition_path(cohorte)):
+            return False
+        return datetime.now() - datetime.fromisoformat(entrada['written_at']) < self.ttl
+
+    def _write(self, cohorte: int, df: pd.DataFrame) -> None:
+        df.to_csv(self.partition_path(cohorte), index=False)
+        self.manifest[str(cohorte)] = {'written_at': datetime.now().isoformat(timespec='seconds'),
+                                       'rows': len(df), 'activos': self.activos(df)}
+
+    def refresh(self, export: pd.DataFrame) -> pd.DataFrame:
+        """
+        Actualiza las particiones con una exportación recién descargada.
+
+        Returns:
+            pd.DataFrame: Exportación donde las cohortes cerradas vigentes vienen de su
+            partición en caché y el resto de la descarga actual
+        """
+        cohortes = self.cohorte_series(export)
+        partes: List[pd.DataFrame] = []
+        a_escribir: Dict[int, pd.DataFrame] = {}
+        reutilizadas = 0
+        for cohorte, df in export.groupby(cohortes):
+            if not self.refresh_closed and self.is_closed(cohorte, df) and self.is_fresh(cohorte):
+                partes.append(pd.read_csv(self.partition_path(cohorte)))
+                reutilizadas += 1
+            else:
+                a_escribir[cohorte] = df
+                partes.append(df)
+
+        with ThreadPoolExecutor(max_workers=Config.PARTITION_WRITE_WORKERS) as executor:
+            list(executor.map(lambda item: self._write(*item), a_escribir.items()))
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+        self.logger.info(f"Particiones por cohorte: {len(a_escribir)} actualizadas, "
+                         f"{reutilizadas} cerradas reutilizadas desde {self.folder}")
+        return pd.concat(partes, ignore_index=True) if partes else export
+
+
+class CohortMemoryStore:
+    """
+    Archivo de memoria de estudiantes (graduados o regulares) particionado por 'Cohorte'.
+
+    Cada cohorte vive en <folder>/cohorte=<año>.csv. La primera vez que se usa, si
+    la carpeta no existe, se migra el CSV plano de memoria y este se renombra a
+    <nombre>.migrado.csv, para que no quede un archivo desactualizado con el
+    nombre que leían las versiones anteriores. Las lecturas pueden
+    limitarse a algunas cohortes y columnas, y upsert solo reescribe las
+    particiones de las cohortes que trae el DataFrame nuevo, de modo que el I/O de
+    cada ejecución crece con las cohortes que cambiaron y no con toda la historia.
+
+    Ejemplo:
+        store = CohortMemoryStore(Config.GRADUADOS_MEMORY, Config.GRADUADOS_MEMORY_FOLDER)
+        store.read(cohortes=[2023, 2024], columns=['RUT', 'Codigo Plan'])
+        store.upsert(nuevos_graduados)
+
+    Attributes:
+        flat_path (str): CSV plano desde el que se migra la memoria
+        folder (str): Carpeta de las particiones
+    """
+    COLUMNA = 'Cohorte'
+    SIN_COHORTE = 0
+
+    def __init__(self, flat_path: str, folder: str):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.flat_path = flat_path
+        self.folder = folder
+        if not os.path.isdir(folder):
+            self._migrate()
+
+    def _migrate(self) -> None:
+        os.makedirs(self.folder, exist_ok=True)
+        if not os.path.exists(self.flat_path):
+            return
+        df = pd.read_csv(self.flat_path)
+        escritas = self._write_partitions(df)
+        migrado = f"{os.path.splitext(self.flat_path)[0]}.migrado.csv"
+        os.replace(self.flat_path, migrado)
+        self.logger.info(f"Memoria {self.flat_path} migrada a {escritas} particiones en {self.folder}; "
+                         f"el CSV plano queda como {migrado}")
+
+    def _cohortes_de(self, df: pd.DataFrame) -> pd.Series:
+        return pd.to_numeric(df[self.COLUMNA], errors='coerce').fillna(self.SIN_COHORTE).astype(int)
+
+    def partition_path(self, cohorte: int) -> str:
+        return os.path.join(self.folder, f"cohorte={cohorte}.csv")
+
+    def cohortes(self) -> List[int]:
+        """Cohortes con partición, ordenadas"""
+        nombres = (re.fullmatch(r'cohorte=(-?\d+)\.csv', nombre) for nombre in os.listdir(self.folder))
+        return sorted(int(match.group(1)) for match in nombres if match)
+
+    def signature(self, cohorte: int) -> Optional[Tuple[int, int]]:
+        """(mtime, tamaño) de la partición, o None si no existe; sirve para cachear sin leerla"""
+        path = self.partition_path(cohorte)
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def read(self, cohortes: Optional[Iterable[int]] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Lee las particiones indicadas (todas si cohortes es None).
+
+        Args:
+            cohortes (Iterable[int], optional): Cohortes a leer
+            columns (List[str], optional): Columnas a leer; el resultado vacío también las trae
+        """
+        cohortes = self.cohortes() if cohortes is None else sorted(set(cohortes))
+        frames = [
+            pd.read_csv(self.partition_path(cohorte), usecols=columns)
+            for cohorte in cohortes if os.path.exists(self.partition_path(cohorte))
+        ]
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        return pd.concat(frames, ignore_index=True)
+
+    def _write_partition(self, cohorte: int, df: pd.DataFrame) -> None:
+        # Se escribe a un temporal y se reemplaza para no dejar particiones a medio escribir
+        path = self.partition_path(cohorte)
+        df.to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    def _write_partitions(self, df: pd.DataFrame) -> int:
+        partes = dict(tuple(df.groupby(self._cohortes_de(df))))
+        with ThreadPoolExecutor(max_workers=Config.PARTITION_WRITE_WORKERS) as executor:
+            list(executor.map(lambda item: self._write_partition(*item), partes.items()))
+        return len(partes)
+
+    def upsert(self, df: pd.DataFrame, key: str = 'id') -> None:
+        """
+        Agrega o reemplaza (por 'key', se conserva el registro nuevo) las filas de df,
+        reescribiendo solo las particiones de sus cohortes.
+        """
+        if df.empty:
+            return
+        cohortes = self._cohortes_de(df)
+        actuales = self.read(cohortes.unique())
+        merged = pd.concat([actuales, df], ignore_index=True)
+        merged = merged.drop_duplicates(subset=[key] if key in merged.columns else None, keep='last')
+        escritas = self._write_partitions(merged)
+        self.logger.info(f"Memoria actualizada en {self.folder}: {len(df)} filas en {escritas} particiones")
@@ -5,12 +5,23 @@ class Config:
     CSRF_ENDPOINT = "/m/estadisticas/funcion"
     
     # Parametros
-    ESTADISTICAS_PARAMS = {
-        "id": "estadisticas__alumnos_postgrado@fcfm.escpostgrado"
-    }
+    # Una estadística por unidad; se descargan en paralelo con la misma sesión
+    ESTADISTICAS_IDS = [
+        "estadisticas__alumnos_postgrado@fcfm.escpostgrado",
+    ]
+    EXPORT_DOWNLOAD_WORKERS = 4
+    # Última exportación válida por unidad; fuera de process_data porque esa carpeta se recrea en cada ejecución
+    EXPORTS_FOLDER = r"input\exportaciones"
     #Cohortes
     MIN_COHORTE = 2018
     MAX_COHORTE = 2025
+    # Una cohorte anterior a MIN_COHORTE sin estudiantes en estados activos se considera cerrada
+    # y se guarda como partición inmutable
+    ESTADOS_ACTIVOS = ["Regular", "Egresado", "Postergación", "En Proceso de Graduación"]
+    EXPORT_PARTITIONS_FOLDER = r"input\particiones_alumnos"
+    CLOSED_COHORTE_TTL_DAYS = 30
+    REFRESH_CLOSED_COHORTES = False
+    PARTITION_WRITE_WORKERS = 4
 
     PROCESS_DATA_FOLDER = r"process_data"
     #archivos input
@@ -18,18 +29,52 @@ class Config:
     TEMPLATE_ESTUDIANTES = r"input\_estudiantes_postgrado.xlsx"
     TEMPLATE_PROGRAMAS= r"input\_programas_postgrado.xlsx"
     TEMPLATE_PROFESORES = r"input\_profesores.xlsx"
+    REFERENCE_CACHE_FOLDER = r"input\.cache"
     #archivos process_data
     WORKTRAY = r"process_data\worktray.xlsx"
     ESTUDIANTES = r"process_data\estudiantes_postgrados.csv"
     PROGRAMAS = r"process_data\programas_postgrado.xlsx"
     PROFESORES = r"process_data\profesores.xlsx"
     STUDENTS_CSV = r"process_data\alumnos_postgrado.csv"
+    STUDENTS_DELTA = r"process_data\alumnos_postgrado_delta.csv"
     MERGED_FILE = r"process_data\estudiantes_postgrado_fcfm.csv"
     #s2_ucampus_get_bia_info
     REGULARES = r"process_data\estudiantes_regulares.csv"
     GRADUADOS = r"process_data\estudiantes_graduados.csv"
     GRADUADOS_MEMORY = r"input\estudiantes_graduados.csv"
     REGULARES_MEMORY = r"input\estudiantes_regulares.csv"
+    # Memoria particionada por cohorte. Los CSV planos solo se leen en la migración inicial,
+    # tras la cual se renombran a *.migrado.csv
+    GRADUADOS_MEMORY_FOLDER = r"input\estudiantes_graduados"
+    REGULARES_MEMORY_FOLDER = r"input\estudiantes_regulares"
+    STUDENTS_CSV_SNAPSHOT = r"input\alumnos_postgrado_anterior.csv"
+    USE_DELTA = True
     COHORTE_MIN_REGULARES = 2011
     COHORTE_MIN_GRADUADOS = 2011
     FILTER_MAX_ROWS = 20
+    STUDENTS_LOG = r"process_data\estudiantes_log.jsonl"
+    LOG_DETAIL_SAMPLE = 25
+    LOG_PROGRESS_EVERY = 10
+    SITUACIONES_PREFETCH_ESTADOS = ["Egresado", "Regular", "En Proceso de Graduación", "Postergación"]
+    SITUACIONES_PREFETCH_WORKERS = 2
+    DEAD_LETTER = r"input\estudiantes_fallidos.csv"
+    #Ejecuciones fallidas tras las cuales un estudiante ya no se reintenta y queda para revisión manual
+    DEAD_LETTER_MAX_INTENTOS = 5
+    RETRY_MAX_ATTEMPTS = 2
+    RETRY_BACKOFF_SECONDS = 30
+    #Grabación y replay de Ucampus: "live", "record" o "replay"
+    UCAMPUS_MODE = "live"
+    RECORD_ARCHIVE = r"input\ucampus_grabacion.zip"
+    #s3_resolve_profesores
+    PROFESORES_RESUELTOS = r"process_data\profesores_guia_resueltos.csv"
+    PROFESOR_MIN_CONFIANZA = 0.75
+    #s4_build_report
+    REPORT_SHEET = "Indicadores"
+    REPORT_CACHE = r"input\.cache\reporte_cohortes.pkl"
+    #Perfilamiento (main.py --profile)
+    PROFILE_FOLDER = r"process_data\perfiles"
+    PROFILE_TOP_N = 30
+    PROFILE_SAMPLE_INTERVAL = 0.01
+    #Cada cuántos segundos se revisa el peak de memoria y cuánto debe crecer (MiB) para tomar un snapshot
+    PROFILE_PEAK_INTERVAL = 0.05
+    PROFILE_PEAK_STEP_MB = 5
@@ -0,0 +1,212 @@
+import pandas as pd
+import numpy as np
+import argparse
+import logging
+import time
+from config import Config
+from cohort_partitions import CohortMemoryStore
+from typing import Dict, Optional
+
+# Configuración del logger
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+class EstudiantesQuery:
+    """
+    API de consultas en memoria sobre los archivos de memoria de estudiantes.
+
+    Los archivos se cargan una sola vez y, por cada columna indexada, se guarda un
+    arreglo de códigos enteros (uno por valor distinto, -1 para los vacíos) y un
+    índice hash valor -> posiciones de fila. Las búsquedas intersectan las
+    posiciones de los índices involucrados y los conteos por grupo se resuelven con
+    los códigos, sin recorrer el DataFrame completo. Los DataFrames conservan sus
+    tipos originales; los valores se comparan normalizados a texto, de modo que
+    451, 451.0 y '451' son la misma llave.
+
+    Ejemplo:
+        query = EstudiantesQuery()
+        query.find('graduados', **{'Profesor guia': 'Andrea Nieto E.'})
+        query.count_by('regulares', 'Cohorte', **{'Codigo Plan': 451})
+    """
+    INDEXED_COLUMNS = ['RUT', 'Codigo Plan', 'Profesor guia', 'Cohorte']
+
+    def __init__(self, frames: Optional[Dict[str, pd.DataFrame]] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        if frames is None:
+            frames = {tipo: store.read() for tipo, store in memory_stores().items()}
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.codes: Dict[str, Dict[str, np.ndarray]] = {}
+        self.valores: Dict[str, Dict[str, pd.Index]] = {}
+        self.indexes: Dict[str, Dict[str, Dict[str, np.ndarray]]] = {}
+        for tipo, df in frames.items():
+            self.frames[tipo] = df.reset_index(drop=True)
+            self.codes[tipo], self.valores[tipo], self.indexes[tipo] = {}, {}, {}
+            for col in self.INDEXED_COLUMNS:
+                if col in df.columns:
+                    self._build_index(tipo, col)
+
+    @staticmethod
+    def _key(valor) -> str:
+        """Llave de texto de un valor: los números enteros se escriben sin decimales"""
+        if isinstance(valor, str):
+            valor = valor.strip()
+            try:
+                numero = float(valor)
+            except ValueError:
+                return valor
+            return str(int(numero)) if numero.is_integer() else valor
+        if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+            return str(int(valor))
+        return str(valor)
+
+    def _build_index(self, tipo: str, col: str) -> None:
+        # Solo se normalizan los valores distintos; los vacíos quedan con código -1, fuera del índice
+        codes, uniques = pd.factorize(self.frames[tipo][col])
+        key_codes, keys = pd.factorize(pd.Index([self._key(v) for v in uniques], dtype=object))
+        codes = np.where(codes >= 0, key_codes[np.maximum(codes, 0)] if len(key_codes) else -1, -1)
+        # Valor original representativo de cada llave, usado como índice en count_by
+        primero = pd.Series(np.arange(len(key_codes))).groupby(key_codes).first().to_numpy()
+        self.codes[tipo][col] = codes
+        self.valores[tipo][col] = pd.Index(uniques.take(primero), name=col)
+
+        validos = np.flatnonzero(codes >= 0)
+        order = validos[np.argsort(codes[validos], kind='stable')]
+        limites = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+        self.indexes[tipo][col] = {
+            key: order[limites[i]:limites[i + 1]] for i, key in enumerate(keys)
+        }
+
+    def _positions(self, tipo: str, filters: Dict) -> np.ndarray:
+        """
+        Parte de la lista de posiciones más corta entre los filtros y verifica el resto
+        de los filtros comparando los códigos solo en esas posiciones.
+        """
+        if not filters:
+            return np.arange(len(self.frames[tipo]))
+        indexes = self.indexes[tipo]
+        for col in filters:
+            if col not in indexes:
+                raise KeyError(f"La columna '{col}' no está indexada")
+        vacio = np.empty(0, dtype=np.int64)
+        candidatos = {col: indexes[col].get(self._key(valor), vacio) for col, valor in filters.items()}
+        base = min(candidatos, key=lambda col: len(candidatos[col]))
+        posiciones = candidatos[base]
+        for col in filters:
+            if col == base or len(posiciones) == 0:
+                continue
+            codes = self.codes[tipo][col]
+            # Todas las posiciones de una llave comparten código: basta con el de la primera
+            posiciones = posiciones[codes[posiciones] == codes[candidatos[col][0]]]
+        return np.sort(posiciones)
+
+    def find(self, tipo: str, **filters) -> pd.DataFrame:
+        """
+        Retorna las filas de 'graduados' o 'regulares' que cumplen todos los filtros.
+
+        Args:
+            tipo (str): 'graduados' o 'regulares'
+            **filters: Pares columna indexada = valor
+        """
+        return self.frames[tipo].iloc[self._positions(tipo, filters)]
+
+    def count_by(self, tipo: str, column: str, **filters) -> pd.Series:
+        """
+        Cuenta las filas por valor de una columna indexada, opcionalmente filtrando.
+
+        Args:
+            tipo (str): 'graduados' o 'regulares'
+            column (str): Columna indexada por la que se agrupa
+            **filters: Pares columna indexada = valor
+        """
+        valores = self.valores[tipo][column]
+        codes = self.codes[tipo][column]
+        if filters:
+            codes = codes[self._positions(tipo, filters)]
+        conteo = np.bincount(codes[codes >= 0], minlength=len(valores))
+        return pd.Series(conteo, index=valores, name='count').loc[lambda s: s > 0].sort_index()
+
+
+def memory_stores() -> Dict[str, CohortMemoryStore]:
+    return {
+        'graduados': CohortMemoryStore(Config.GRADUADOS_MEMORY, Config.GRADUADOS_MEMORY_FOLDER),
+        'regulares': CohortMemoryStore(Config.REGULARES_MEMORY, Config.REGULARES_MEMORY_FOLDER),
+    }
+
+
+def benchmark(rows: int = 100_000, repeticiones: int = 1_000) -> Dict[str, float]:
+    """
+    Mide la latencia de carga, búsqueda y conteo replicando los archivos de memoria
+    hasta 'rows' filas por tipo. Retorna los tiempos en milisegundos.
+    """
+    frames = {}
+    for tipo, store in memory_stores().items():
+        df = store.read()
+        original = len(df)
+        df = pd.concat([df] * -(-rows // original), ignore_index=True).iloc[:rows]
+        # RUT distinto por copia para que el índice de RUT tenga cardinalidad realista
+        df['RUT'] = df['RUT'].astype(str) + '_' + (df.index // original).astype(str)
+        frames[tipo] = df
+
+    inicio = time.perf_counter()
+    query = EstudiantesQuery(frames)
+    tiempos = {'build_ms': (time.perf_counter() - inicio) * 1000}
+
+    graduados = frames['graduados']
+    profesor = graduados['Profesor guia'].dropna().iloc[0]
+    rut = graduados['RUT'].iloc[len(graduados) // 2]
+    consultas = {
+        'find_rut_ms': lambda: query.find('graduados', RUT=rut),
+        'find_profesor_ms': lambda: query.find('graduados', **{'Profesor guia': profesor}),
+        'find_plan_cohorte_ms': lambda: query.find('regulares', **{'Codigo Plan': 451, 'Cohorte': 2023}),
+        'count_cohorte_ms': lambda: query.count_by('regulares', 'Cohorte', **{'Codigo Plan': 451}),
+    }
+    for nombre, consulta in consultas.items():
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            consulta()
+        tiempos[nombre] = (time.perf_counter() - inicio) * 1000 / repeticiones
+
+    # Referencia: el mismo filtro con un recorrido completo del DataFrame
+    regulares = frames['regulares']
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        regulares[(regulares['Codigo Plan'] == 451) & (regulares['Cohorte'] == 2023)]
+    tiempos['full_scan_plan_cohorte_ms'] = (time.perf_counter() - inicio) * 1000 / repeticiones
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        graduados[graduados['Profesor guia'] == profesor]
+    tiempos['full_scan_profesor_ms'] = (time.perf_counter() - inicio) * 1000 / repeticiones
+    return tiempos
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Consultas sobre los archivos de memoria de estudiantes")
+    parser.add_argument('tipo', nargs='?', choices=['graduados', 'regulares'], default='graduados')
+    parser.add_argument('--rut')
+    parser.add_argument('--plan', help="Codigo Plan")
+    parser.add_argument('--profesor', help="Profesor guia")
+    parser.add_argument('--cohorte')
+    parser.add_argument('--count-by', choices=EstudiantesQuery.INDEXED_COLUMNS)
+    parser.add_argument('--benchmark', type=int, metavar='FILAS', help="Mide latencias con FILAS filas por tipo")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for nombre, valor in benchmark(args.benchmark).items():
+            print(f"{nombre}: {valor:.3f}")
+        return
+
+    filters = {
+        col: valor for col, valor in [
+            ('RUT', args.rut), ('Codigo Plan', args.plan),
+            ('Profesor guia', args.profesor), ('Cohorte', args.cohorte)
+        ] if valor is not None
+    }
+    query = EstudiantesQuery()
+    if args.count_by:
+        print(query.count_by(args.tipo, args.count_by, **filters).to_string())
+    else:
+        print(query.find(args.tipo, **filters).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
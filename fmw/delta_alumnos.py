@@ -0,0 +1,136 @@
+import pandas as pd
+import shutil
+import os
+import logging
+from config import Config
+from typing import Dict, List
+
+# Configuración del logger
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+class DeltaAlumnosPostgrado:
+    """
+    Calcula las diferencias entre dos exportaciones sucesivas de alumnos_postgrado.
+
+    Cada fila se identifica por la llave RUT + Plan y se resume en un hash de su
+    contenido, calculado solo sobre las columnas presentes en ambas exportaciones
+    (una columna nueva no marca todas las filas como modificadas). Comparando los hashes de la exportación actual con los de la
+    exportación anterior se obtienen tres conjuntos: filas agregadas, eliminadas
+    y modificadas (por ejemplo, un cambio de estado de Regular a Graduado).
+
+    Attributes:
+        students_csv_file (str): Exportación actual descargada en s1
+        snapshot_file (str): Copia de la última exportación procesada con éxito
+        delta_file (str): Archivo con las filas agregadas, eliminadas y modificadas
+    """
+    KEY_COLUMNS = ['RUT', 'Plan']
+    AGREGADO = 'Agregado'
+    ELIMINADO = 'Eliminado'
+    MODIFICADO = 'Modificado'
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.students_csv_file = Config.STUDENTS_CSV
+        self.snapshot_file = Config.STUDENTS_CSV_SNAPSHOT
+        self.delta_file = Config.STUDENTS_DELTA
+
+    def _read_export(self, path: str) -> pd.DataFrame:
+        """Lee una exportación como texto, sin inferir tipos ni convertir vacíos a NaN"""
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    def _hash_rows(self, df: pd.DataFrame, columnas: List[str]) -> pd.Series:
+        """Retorna el hash de las columnas indicadas de cada fila indexado por la llave RUT + Plan"""
+        df = df.drop_duplicates(subset=self.KEY_COLUMNS, keep='last')
+        hashes = pd.util.hash_pandas_object(df[columnas], index=False)
+        hashes.index = pd.MultiIndex.from_frame(df[self.KEY_COLUMNS])
+        return hashes
+
+    def compute_delta(self, df_actual: pd.DataFrame, df_anterior: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compara dos exportaciones y retorna las filas que cambiaron.
+
+        Args:
+            df_actual (pd.DataFrame): Exportación nueva
+            df_anterior (pd.DataFrame): Exportación anterior
+
+        Returns:
+            pd.DataFrame: Filas de la exportación nueva (o de la anterior, en el caso de
+            las eliminadas) con las columnas adicionales 'Tipo cambio' y 'Estado anterior'
+        """
+        columnas = sorted(set(df_actual.columns) & set(df_anterior.columns))
+        distintas = set(df_actual.columns) ^ set(df_anterior.columns)
+        if distintas:
+            self.logger.warning(f"Columnas presentes en una sola exportación, no se comparan: {sorted(distintas)}")
+        hash_actual = self._hash_rows(df_actual, columnas)
+        hash_anterior = self._hash_rows(df_anterior, columnas)
+
+        agregados = hash_actual.index.difference(hash_anterior.index)
+        eliminados = hash_anterior.index.difference(hash_actual.index)
+        comunes = hash_actual.index.intersection(hash_anterior.index)
+        modificados = comunes[hash_actual.loc[comunes].values != hash_anterior.loc[comunes].values]
+
+        actual = df_actual.drop_duplicates(subset=self.KEY_COLUMNS, keep='last').set_index(self.KEY_COLUMNS)
+        anterior = df_anterior.drop_duplicates(subset=self.KEY_COLUMNS, keep='last').set_index(self.KEY_COLUMNS)
+
+        partes = []
+        for tipo, llaves, origen in [
+            (self.AGREGADO, agregados, actual),
+            (self.MODIFICADO, modificados, actual),
+            (self.ELIMINADO, eliminados, anterior),
+        ]:
+            parte = origen.loc[llaves].copy()
+            parte['Tipo cambio'] = tipo
+            parte['Estado anterior'] = anterior['Estado del Plan'].reindex(llaves).values if tipo != self.AGREGADO else ''
+            partes.append(parte)
+
+        return pd.concat(partes).reset_index()
+
+    def summarize(self, delta: pd.DataFrame) -> Dict[str, int]:
+        """Cuenta las filas de cada tipo de cambio"""
+        conteo = delta['Tipo cambio'].value_counts()
+        return {tipo: int(conteo.get(tipo, 0)) for tipo in [self.AGREGADO, self.MODIFICADO, self.ELIMINADO]}
+
+    def commit_snapshot(self) -> None:
+        """
+        Guarda la exportación actual como referencia para la próxima ejecución.
+
+        Se llama solo cuando las etapas que consumen el delta terminaron bien, para
+        no perder cambios si la ejecución se interrumpe.
+        """
+        if not os.path.exists(self.students_csv_file):
+            self.logger.warning(f"No existe {self.students_csv_file}, no se actualiza la exportación de referencia")
+            return
+        shutil.copyfile(src=self.students_csv_file, dst=self.snapshot_file)
+        self.logger.info(f"Exportación de referencia actualizada en {self.snapshot_file}")
+
+    def run_workflow(self) -> None:
+        """
+        Calcula el delta entre la exportación actual y la anterior y lo guarda en
+        process_data para que las etapas siguientes procesen solo esas filas.
+        """
+        self.logger.info(f"************ Inicio del workflow {self.__class__.__name__} ************")
+        df_actual = self._read_export(self.students_csv_file)
+        if os.path.exists(self.snapshot_file):
+            df_anterior = self._read_export(self.snapshot_file)
+        else:
+            self.logger.info(f"No existe exportación anterior en {self.snapshot_file}, todas las filas se consideran agregadas")
+            df_anterior = df_actual.iloc[0:0]
+
+        delta = self.compute_delta(df_actual, df_anterior)
+        delta.to_csv(self.delta_file, index=False)
+
+        resumen = self.summarize(delta)
+        self.logger.info(f"Filas en exportación actual: {len(df_actual)}")
+        for tipo, cantidad in resumen.items():
+            self.logger.info(f"{tipo}s: {cantidad}")
+        cambios_estado = delta.loc[
+            (delta['Tipo cambio'] == self.MODIFICADO) & (delta['Estado anterior'] != delta['Estado del Plan'])
+        ]
+        self.logger.info(f"Cambios de estado: {len(cambios_estado)}")
+        self.logger.info(f"Delta guardado en {self.delta_file}")
+        self.logger.info(f"************ Termino del workflow {self.__class__.__name__} ************")
+
+
+if __name__ == "__main__":
+    DeltaAlumnosPostgrado().run_workflow()
@@ -0,0 +1,131 @@
+import json
+import logging
+import logging.handlers
+import queue
+from collections import Counter
+from config import Config
+from typing import Dict, Optional, Tuple
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que encola el registro sin formatearlo.
+
+    El QueueHandler estándar formatea el mensaje en el hilo que hace el log; aquí
+    el formateo queda para el hilo del QueueListener.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'), 'level': record.levelname}
+        data.update(record.student)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _StudentRecordFilter(logging.Filter):
+    def __init__(self, include: bool):
+        super().__init__()
+        self.include = include
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return hasattr(record, 'student') == self.include
+
+
+class StudentLogPipeline:
+    """
+    Logging no bloqueante para el loop por estudiante de s2.
+
+    Los registros del logger indicado se encolan sin formatear y un hilo
+    QueueListener los escribe: los mensajes normales a consola con el formato
+    habitual y un registro JSON por estudiante en Config.STUDENTS_LOG. El detalle
+    legible por estudiante solo se escribe a consola para 1 de cada
+    'sample_every' estudiantes; los totales por estado se acumulan y se
+    informan al cerrar el pipeline.
+
+    Un estudiante reintentado genera un registro JSON por intento (campo
+    'intento', 0 en la primera pasada), pero en los totales por estado solo
+    cuenta su último resultado.
+
+    Ejemplo:
+        pipeline = StudentLogPipeline(self.logger)
+        pipeline.start()
+        pipeline.student(rut, programa, 'ok', tesis_info, duracion)
+        pipeline.stop()
+    """
+    def __init__(self, logger: logging.Logger, json_path: str = Config.STUDENTS_LOG,
+                 sample_every: int = Config.LOG_DETAIL_SAMPLE):
+        self.logger = logger
+        self.json_path = json_path
+        self.sample_every = sample_every
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.resultados: Dict[Tuple[str, str], str] = {}
+        self.registros = 0
+        self.duracion_total = 0.0
+        self.page_loads_total = 0
+        self._propagate = logger.propagate
+
+    def start(self) -> None:
+        consola = logging.StreamHandler()
+        consola.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        consola.addFilter(_StudentRecordFilter(include=False))
+
+        archivo = logging.FileHandler(self.json_path, mode='a', encoding='utf-8')
+        archivo.setFormatter(_JsonLinesFormatter())
+        archivo.addFilter(_StudentRecordFilter(include=True))
+
+        self.archivo = archivo
+        self.listener = logging.handlers.QueueListener(self.queue, consola, archivo, respect_handler_level=True)
+        self.listener.start()
+        self.handler = _LazyQueueHandler(self.queue)
+        self.logger.addHandler(self.handler)
+        # Evita que el handler de consola del root escriba el mismo registro en el hilo del scraping
+        self.logger.propagate = False
+
+    @property
+    def totales(self) -> Counter:
+        """Cantidad de estudiantes por estado, según el último intento de cada uno"""
+        return Counter(self.resultados.values())
+
+    def student(self, rut: str, programa: str, estado: str, tesis_info: Optional[Dict] = None,
+                duracion: float = 0.0, error: Optional[str] = None, page_loads: int = 0,
+                intento: int = 0) -> None:
+        """Encola un registro JSON con el resultado de un intento de procesar a un estudiante"""
+        self.resultados[(rut, programa)] = estado
+        self.registros += 1
+        self.duracion_total += duracion
+        self.page_loads_total += page_loads
+        data = {'rut': rut, 'programa': programa, 'estado': estado, 'intento': intento,
+                'duracion_s': round(duracion, 3), 'page_loads': page_loads}
+        if tesis_info:
+            data.update({
+                'profesor': tesis_info.get('professor', ''),
+                'nota': tesis_info.get('nota', ''),
+                'fecha_examen': tesis_info.get('fecha_examen', ''),
+                'titulo': tesis_info.get('titulo_examen', ''),
+            })
+        if error:
+            data['error'] = error
+        self.logger.info('estudiante', extra={'student': data})
+
+        if self.sample_every and self.registros % self.sample_every == 0:
+            self.logger.info("Muestra %s - %s - %s - profesor: %s", rut, programa, estado,
+                             (tesis_info or {}).get('professor', 'No disponible'))
+
+    def stop(self) -> None:
+        procesados = len(self.resultados)
+        if procesados:
+            # Duración y cargas de página incluyen los reintentos: son el costo real por estudiante
+            self.logger.info("Resumen por estado: %s - reintentos %d - duración promedio %.2f s - "
+                             "cargas de página por estudiante %.2f",
+                             dict(self.totales), self.registros - procesados, self.duracion_total / procesados,
+                             self.page_loads_total / procesados)
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+            self.logger.removeHandler(self.handler)
+            self.archivo.close()
+        self.logger.propagate = self._propagate
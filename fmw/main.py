@@ -1,10 +1,16 @@
+import argparse
+import contextlib
 import logging
 import os
 from enum import Enum
 from config import Config
 from build_worktray import BuildWorktray
 from s1_download_students_list import UcampusEstudiantesPostgrado
-from fmw.s2_build_regulares_graduados_file import UcampusEstudiantesManager  
+from delta_alumnos import DeltaAlumnosPostgrado
+from s2_build_regulares_graduados_file import UcampusEstudiantesManager
+from s3_resolve_profesores import ResolverProfesoresGuia
+from s4_build_report import ReporteWorktray
+from profiling import StageProfiler
 
 # Configuración del logger
 logging.basicConfig(
@@ -13,31 +19,51 @@ logging.basicConfig(
 )
 
 class State(Enum):
-    GET_DATABASE_INFO = 0
-    DOWNLOAD_STUDENTS_CSV = 1
-    GET_ESTUDIANTES_INFO_FROM_BIA = 2
+    BUILD_WORKTRAY = 0
+    DOWNLOAD_STUDENTS = 1
+    COMPUTE_DELTA = 2
+    GET_ESTUDIANTES = 3
+    RESOLVE_PROFESORES = 4
+    BUILD_REPORT = 5
 
 class Robot:
-    def __init__(self, start_state: int, final_state: int):
+    def __init__(self, start_state: int, final_state: int, profile: bool = False,
+                 sample_interval: float = None):
         self.url = Config.BASE_URL
         self.state = start_state
         self.final_state = final_state
+        self.profile = profile
+        self.sample_interval = sample_interval
         self.logger = logging.getLogger(self.__class__.__name__)
 
+    def _stage_context(self):
+        """Perfila la etapa actual si el robot corre con --profile"""
+        if not self.profile:
+            return contextlib.nullcontext()
+        nombre = next((s.name.lower() for s in State if s.value == self.state), f"estado_{self.state}")
+        return StageProfiler(f"{self.state}_{nombre}", sample_interval=self.sample_interval)
+
     def run(self):
         self.logger.info(f"Iniciando proceso desde estado {self.state} hasta estado {self.final_state}")
         try:
             while self.state <= self.final_state:
                 self.logger.info(f"Ejecutando estado {self.state}")
                 
-                if self.state == State.BUILD_WORKTRAY.value:
-                    BuildWorktray().run_workflow()
-                elif self.state == State.DOWNLOAD_STUDENTS.value:
-                    UcampusEstudiantesPostgrado().run_workflow()
-                elif self.state == State.GET_ESTUDIANTES.value:
-                    UcampusEstudiantesManager().run_workflow()
-                else:
-                    self.logger.warning(f"Estado {self.state} no implementado")
+                with self._stage_context():
+                    if self.state == State.BUILD_WORKTRAY.value:
+                        BuildWorktray().run_workflow()
+                    elif self.state == State.DOWNLOAD_STUDENTS.value:
+                        UcampusEstudiantesPostgrado().run_workflow()
+                    elif self.state == State.COMPUTE_DELTA.value:
+                        DeltaAlumnosPostgrado().run_workflow()
+                    elif self.state == State.GET_ESTUDIANTES.value:
+                        UcampusEstudiantesManager().run_workflow()
+                    elif self.state == State.RESOLVE_PROFESORES.value:
+                        ResolverProfesoresGuia().run_workflow()
+                    elif self.state == State.BUILD_REPORT.value:
+                        ReporteWorktray().run_workflow()
+                    else:
+                        self.logger.warning(f"Estado {self.state} no implementado")
                 
                 self.state += 1
                 
@@ -48,8 +74,19 @@ class Robot:
         self.logger.info("Proceso completado exitosamente")
 
 if __name__ == "__main__":    
+    parser = argparse.ArgumentParser(description="Robot de estudiantes de postgrado")
+    parser.add_argument('--start', type=int, default=0, help="Estado inicial")
+    parser.add_argument('--final', type=int, default=5, help="Estado final")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Perfila cada etapa con cProfile y tracemalloc en {Config.PROFILE_FOLDER}")
+    parser.add_argument('--sample', nargs='?', type=float, const=Config.PROFILE_SAMPLE_INTERVAL, metavar='SEGUNDOS',
+                        help="Con --profile, muestrea los stacks de todos los hilos para un flamegraph")
+    args = parser.parse_args()
+    if args.sample is not None and not args.profile:
+        parser.error("--sample requiere --profile")
     try:
-        robot = Robot(start_state=0, final_state=2)
+        robot = Robot(start_state=args.start, final_state=args.final, profile=args.profile,
+                      sample_interval=args.sample)
         robot.run()
     except Exception as e:
         logging.error(f"Error en la ejecución del robot: {str(e)}", exc_info=True)
@@ -0,0 +1,186 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from config import Config
+from typing import Optional
+
+# Configuración del logger
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+class _StackSampler:
+    """
+    Muestrea cada 'interval' segundos el stack de todos los hilos con
+    sys._current_frames() y acumula las pilas en formato colapsado
+    (hilo;func (archivo:línea);...), compatible con flamegraph.pl y speedscope.
+
+    A diferencia de cProfile, que solo mide el hilo que lo activa, el muestreo ve
+    también los hilos de prefetch, descargas y logging, y cuenta el tiempo de
+    espera (Selenium, red) como tiempo de pared.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        funciones = []
+        while frame is not None:
+            code = frame.f_code
+            funciones.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join([thread_name] + funciones[::-1])
+
+    def _run(self) -> None:
+        propio = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            nombres = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != propio:
+                    self.stacks[self._collapse(nombres.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='StackSampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _PeakWatcher:
+    """
+    Revisa cada 'interval' segundos el peak de tracemalloc y, cada vez que supera
+    en al menos 'step' bytes al último capturado, toma un snapshot. Así el reporte
+    de asignaciones refleja lo que estaba vivo en el peak y no lo que quedó al
+    terminar la etapa.
+    """
+    def __init__(self, interval: float, step: int):
+        self.interval = interval
+        self.step = step
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            actual, peak = tracemalloc.get_traced_memory()
+            # Solo se captura cuando la memoria está cerca del peak, no después de liberarla
+            if peak >= self.peak + self.step and actual >= peak - self.step:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.peak = peak
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='PeakWatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+class StageProfiler:
+    """
+    Context manager que perfila una etapa del Robot con cProfile y tracemalloc y,
+    opcionalmente, con muestreo de stacks de todos los hilos.
+
+    Al salir escribe en 'folder':
+        <etapa>.pstats: estadísticas de cProfile (python -m pstats, snakeviz)
+        <etapa>_pstats.txt: top N funciones por tiempo acumulado
+        <etapa>_allocaciones.txt: top N sitios de asignación de memoria respecto del
+            inicio de la etapa, en el peak y al terminar
+        <etapa>.folded: stacks colapsados para flamegraph (solo con muestreo)
+
+    Ejemplo:
+        with StageProfiler('get_estudiantes', sample_interval=0.01):
+            UcampusEstudiantesManager().run_workflow()
+    """
+    def __init__(self, stage: str, folder: str = Config.PROFILE_FOLDER, top_n: int = Config.PROFILE_TOP_N,
+                 sample_interval: Optional[float] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.stage = stage
+        self.folder = folder
+        self.top_n = top_n
+        self.profiler = cProfile.Profile()
+        self.sampler = _StackSampler(sample_interval) if sample_interval else None
+        self.peak_watcher = _PeakWatcher(Config.PROFILE_PEAK_INTERVAL, Config.PROFILE_PEAK_STEP_MB * 1024 * 1024)
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self.folder, f"{self.stage}{suffix}")
+
+    def __enter__(self) -> 'StageProfiler':
+        self._tracing = not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+        self.baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        self.peak_watcher.start()
+        if self.sampler:
+            self.sampler.start()
+        self.start_time = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.profiler.disable()
+        duracion = time.perf_counter() - self.start_time
+        if self.sampler:
+            self.sampler.stop()
+        self.peak_watcher.stop()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self._tracing:
+            tracemalloc.stop()
+
+        # La etapa BUILD_WORKTRAY recrea process_data, por eso la carpeta se crea al final
+        os.makedirs(self.folder, exist_ok=True)
+        self.profiler.dump_stats(self._path('.pstats'))
+        texto = io.StringIO()
+        pstats.Stats(self.profiler, stream=texto).sort_stats('cumulative').print_stats(self.top_n)
+        with open(self._path('_pstats.txt'), 'w', encoding='utf-8') as f:
+            f.write(texto.getvalue())
+
+        filtros = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ]
+        baseline = self.baseline.filter_traces(filtros)
+        secciones = [('Al terminar la etapa', snapshot)]
+        if self.peak_watcher.snapshot is not None:
+            secciones.insert(0, (f"En el peak ({self.peak_watcher.peak / 1024 / 1024:.2f} MiB)",
+                                 self.peak_watcher.snapshot))
+        with open(self._path('_allocaciones.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Peak: {peak / 1024 / 1024:.2f} MiB\n")
+            for titulo, captura in secciones:
+                f.write(f"\n{titulo}, diferencia respecto del inicio:\n")
+                for stat in captura.filter_traces(filtros).compare_to(baseline, 'lineno')[:self.top_n]:
+                    f.write(f"{stat}\n")
+
+        if self.sampler:
+            self.sampler.write(self._path('.folded'))
+
+        self.logger.info(f"Perfil de {self.stage}: {duracion:.2f} s, peak de memoria {peak / 1024 / 1024:.2f} MiB"
+                         + (f", {self.sampler.samples} muestras de stacks" if self.sampler else "")
+                         + f" - archivos en {self.folder}")
+        return False
@@ -0,0 +1,159 @@
+import logging
+import os
+import re
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote_plus
+from config import Config
+from typing import Optional
+
+# Configuración del logger
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+LIVE = 'live'
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+def rut_key(rut: str) -> Optional[str]:
+    """Llave del archivo para un RUT: solo el número, sin dígito verificador"""
+    match = re.search(r'\d{6,9}', str(rut))
+    return match.group(0) if match else None
+
+
+class PageArchive:
+    """
+    Archivo zip comprimido con las páginas de Ucampus de una ejecución.
+
+    Contiene la exportación de s1 (export/alumnos_postgrado.csv) y, por cada RUT,
+    el boletín (boletin/<rut>.html) y la página de situaciones
+    (situaciones/<rut>.html). Las escrituras se serializan con un lock porque las
+    situaciones se descargan desde hilos de prefetch.
+
+    Attributes:
+        path (str): Ruta del archivo zip
+        mode (str): RECORD para escribir, REPLAY para leer
+    """
+    EXPORT_ENTRY = 'export/alumnos_postgrado.csv'
+
+    def __init__(self, path: str, mode: str):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        if mode == RECORD:
+            self.zip = zipfile.ZipFile(path, 'a' if os.path.exists(path) else 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            self.zip = zipfile.ZipFile(path, 'r')
+        self.entries = set(self.zip.namelist())
+
+    def save_page(self, kind: str, rut: str, html: str) -> None:
+        name = f"{kind}/{rut_key(rut)}.html"
+        with self.lock:
+            if name in self.entries:
+                # zipfile no permite reemplazar entradas; se conserva la primera grabación
+                return
+            self.zip.writestr(name, html)
+            self.entries.add(name)
+
+    def has_page(self, kind: str, rut: str) -> bool:
+        return f"{kind}/{rut_key(rut)}.html" in self.entries
+
+    def load_page(self, kind: str, rut: str) -> Optional[str]:
+        name = f"{kind}/{rut_key(rut)}.html"
+        if name not in self.entries:
+            return None
+        with self.lock:
+            return self.zip.read(name).decode('utf-8')
+
+    def save_export(self, csv_path: str) -> None:
+        with self.lock:
+            if self.EXPORT_ENTRY not in self.entries:
+                self.zip.write(csv_path, self.EXPORT_ENTRY)
+                self.entries.add(self.EXPORT_ENTRY)
+
+    def restore_export(self, csv_path: str) -> None:
+        with self.lock, open(csv_path, 'wb') as f:
+            f.write(self.zip.read(self.EXPORT_ENTRY))
+        self.logger.info(f"Exportación restaurada desde {self.path} en {csv_path}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.zip.close()
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    archive: PageArchive = None
+    base_url: str = ''
+
+    LOGIN_PAGE = """<html><body><form method="post" action="/">
+<input name="username" type="text"><input name="password" type="password">
+<input type="submit" value="Ingresar"></form></body></html>"""
+    HOME_PAGE = """<html><body><a href="{base}/m/fcfm_bia/">Boletines</a></body></html>"""
+    SEARCH_PAGE = """<html><body><form method="get" action="/m/fcfm_bia/">
+<input type="text" class="autofocus" placeholder="Persona" name="rut">
+<input type="submit" value="Buscar"></form></body></html>"""
+
+    def _respond(self, html: Optional[str]) -> None:
+        body = (html if html is not None else '<html><body></body></html>').encode('utf-8')
+        self.send_response(200 if html is not None else 404)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self, query: str) -> None:
+        path = self.path.split('?', 1)[0]
+        rut = rut_key(unquote_plus(query))
+        if path.rstrip('/') == '':
+            self._respond(self.HOME_PAGE.format(base=self.base_url) if self.command == 'POST' else self.LOGIN_PAGE)
+        elif 'situaciones' in path and rut:
+            self._respond(self._rewrite(self.archive.load_page('situaciones', rut)))
+        elif rut:
+            self._respond(self._rewrite(self.archive.load_page('boletin', rut)))
+        else:
+            self._respond(self.SEARCH_PAGE)
+
+    def _rewrite(self, html: Optional[str]) -> Optional[str]:
+        # Los enlaces absolutos de la página grabada apuntan al servidor local
+        return html.replace(Config.BASE_URL, self.base_url) if html is not None else None
+
+    def do_GET(self):
+        self._serve(self.path.split('?', 1)[1] if '?' in self.path else '')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self._serve(self.rfile.read(length).decode('utf-8', errors='ignore'))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UcampusReplayServer:
+    """
+    Servidor HTTP local que reemplaza a Ucampus sirviendo las páginas de un PageArchive.
+
+    Entrega una página de login, el enlace a Boletines, el formulario de búsqueda y,
+    para cada RUT buscado, el boletín y la página de situaciones grabados. Permite
+    ejecutar s2 sin red y con resultados deterministas.
+    """
+    def __init__(self, archive: PageArchive):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.archive = archive
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> str:
+        handler = type('ReplayHandler', (_ReplayHandler,), {'archive': self.archive})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        handler.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.logger.info(f"Servidor de replay iniciado en {handler.base_url}")
+        return handler.base_url
+
+    def stop(self) -> None:
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
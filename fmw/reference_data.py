@@ -0,0 +1,131 @@
+import pandas as pd
+import hashlib
+import glob
+import logging
+import os
+from openpyxl import load_workbook
+from config import Config
+from typing import Dict, Optional
+
+# Configuración del logger
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+class ReferenceDataLoader:
+    """
+    Carga los archivos Excel de referencia (programas, profesores, estudiantes).
+
+    Cada libro se lee una sola vez con openpyxl en modo read-only y se guarda como
+    pickle en un caché indexado por ruta + fecha de modificación + hash del archivo.
+    Las cargas siguientes se sirven desde el caché mientras el Excel no cambie.
+
+    Attributes:
+        cache_folder (str): Carpeta donde se guardan los archivos de caché
+    """
+    PROGRAMAS_DTYPES = {
+        'Tipo': 'category',
+        'Nombre Programa': 'string',
+        'Encontrado': 'boolean',
+    }
+    PROFESORES_DTYPES = {
+        'Nombre ucampus': 'string',
+        'Nombre portafolio': 'string',
+        'URL portafolio': 'string',
+        'Pagina encontrada': 'boolean',
+        'Jornada': 'category',
+        'Jerarquia': 'Float64',
+        'Sexo': 'category',
+        'Rut': 'string',
+    }
+    ESTUDIANTES_DTYPES = {
+        'Nombre estudiante': 'string',
+        'Rut': 'string',
+        'Cohorte': 'Int64',
+        'Programa': 'string',
+        'Tesista': 'string',
+        'Profesor guia': 'string',
+        'Sexo': 'category',
+        'Rut profesor': 'string',
+    }
+
+    def __init__(self, cache_folder: str = Config.REFERENCE_CACHE_FOLDER):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.cache_folder = cache_folder
+        os.makedirs(self.cache_folder, exist_ok=True)
+
+    @staticmethod
+    def _file_hash(path: str) -> str:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(chunk)
+        return sha1.hexdigest()
+
+    def _cache_path(self, path: str) -> str:
+        key = f"{os.path.abspath(path)}|{os.stat(path).st_mtime_ns}|{self._file_hash(path)}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self.cache_folder, f"{name}_{digest}.pkl")
+
+    @staticmethod
+    def _read_workbook(path: str, sheet_name: Optional[str] = None) -> pd.DataFrame:
+        """Lee la hoja en modo streaming, sin cargar estilos ni el libro completo en memoria"""
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, ())
+            columns = [str(c) for c in header if c is not None]
+            data = [row[:len(columns)] for row in rows if any(v is not None for v in row)]
+            return pd.DataFrame(data, columns=columns)
+        finally:
+            wb.close()
+
+    @staticmethod
+    def _apply_dtypes(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+        for col, dtype in dtypes.items():
+            if col not in df.columns:
+                continue
+            if dtype == 'boolean' and df[col].dtype == object:
+                # Algunos libros guardan los booleanos como texto 'TRUE'/'FALSE'
+                df[col] = df[col].map(lambda v: v.strip().upper() == 'TRUE' if isinstance(v, str) else v)
+            df[col] = df[col].astype(dtype)
+        return df
+
+    def load(self, path: str, dtypes: Optional[Dict[str, str]] = None, sheet_name: Optional[str] = None) -> pd.DataFrame:
+        """
+        Retorna el contenido del Excel como DataFrame tipado, usando el caché si está vigente.
+
+        Args:
+            path (str): Ruta al archivo Excel
+            dtypes (Dict[str, str], optional): Tipos de las columnas conocidas
+            sheet_name (str, optional): Hoja a leer, por defecto la primera
+        """
+        cache_path = self._cache_path(path)
+        if os.path.exists(cache_path):
+            self.logger.info(f"Cargando {path} desde caché {cache_path}")
+            return pd.read_pickle(cache_path)
+
+        self.logger.info(f"Convirtiendo {path} a caché")
+        df = self._apply_dtypes(self._read_workbook(path, sheet_name), dtypes or {})
+        # Eliminar cachés antiguos del mismo archivo antes de guardar el nuevo
+        name = os.path.splitext(os.path.basename(path))[0]
+        for old in glob.glob(os.path.join(self.cache_folder, f"{name}_*.pkl")):
+            os.remove(old)
+        df.to_pickle(cache_path)
+        return df
+
+    def load_programas(self, path: str = Config.TEMPLATE_PROGRAMAS) -> pd.DataFrame:
+        return self.load(path, self.PROGRAMAS_DTYPES)
+
+    def load_profesores(self, path: str = Config.TEMPLATE_PROFESORES) -> pd.DataFrame:
+        return self.load(path, self.PROFESORES_DTYPES)
+
+    def load_estudiantes(self, path: str = Config.TEMPLATE_ESTUDIANTES) -> pd.DataFrame:
+        return self.load(path, self.ESTUDIANTES_DTYPES)
+
+
+if __name__ == "__main__":
+    loader = ReferenceDataLoader()
+    for df in [loader.load_programas(), loader.load_profesores(), loader.load_estudiantes()]:
+        print(df.dtypes)
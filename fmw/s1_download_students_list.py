@@ -7,8 +7,14 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 import logging
 import os
+import re
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from dotenv import load_dotenv
 from config import Config
+from record_replay import RECORD, REPLAY, PageArchive
+from cohort_partitions import CohortPartitionStore
 
 # Configuración del logger
 logging.basicConfig(level=logging.INFO,
@@ -27,6 +33,8 @@ class UcampusEstudiantesPostgrado:
         user (str): Usuario de Ucampus obtenido de variables de entorno
         password (str): Contraseña de Ucampus obtenida de variables de entorno
         students_csv_file (str): Ruta donde se guardará el archivo CSV de estudiantes
+        estadisticas_ids (list): Ids de las estadísticas a descargar, una por unidad
+        exports_folder (str): Carpeta con una subcarpeta por unidad para cada exportación
     """
     def __init__(self, keep_web_alive=True):
         load_dotenv()
@@ -35,12 +43,17 @@ class UcampusEstudiantesPostgrado:
         self.logger = logging.getLogger(self.__class__.__name__)
         self.user = os.getenv("UCAMPUS_USER")
         self.password = os.getenv("UCAMPUS_PASSWORD")
-        self.driver = self._setup_driver()
+        self.mode = Config.UCAMPUS_MODE
+        # En replay la exportación sale del archivo grabado, no se necesita navegador
+        self.driver = self._setup_driver() if self.mode != REPLAY else None
         self.wait_1 = WebDriverWait(self.driver, 1)
         self.wait_2 = WebDriverWait(self.driver, 2)
         self.wait_10 = WebDriverWait(self.driver, 10)
         self.wait_20 = WebDriverWait(self.driver, 20)
         self.students_csv_file = Config.STUDENTS_CSV
+        self.estadisticas_ids = Config.ESTADISTICAS_IDS
+        self.exports_folder = Config.EXPORTS_FOLDER
+        self.session = requests.Session()
         os.makedirs(os.path.dirname(self.students_csv_file), exist_ok=True)
 
     def _setup_driver(self):
@@ -113,12 +126,12 @@ class UcampusEstudiantesPostgrado:
         cookies_str = '; '.join([f"{cookie['name']}={cookie['value']}" for cookie in selenium_cookies])
         return cookies_str
     
-    def get_csrf_token(self, cookies):
+    def get_csrf_token(self, estadistica_id):
         """
         Obtiene el token CSRF necesario para las operaciones seguras.
         
         Args:
-            cookies (str): String de cookies de la sesión activa
+            estadistica_id (str): Id de la estadística, ej. estadisticas__alumnos_postgrado@fcfm.escpostgrado
             
         Returns:
             str or None: Token CSRF si se encuentra, None en caso contrario
@@ -126,64 +139,131 @@ class UcampusEstudiantesPostgrado:
         try:
             url = self.url + Config.CSRF_ENDPOINT
             params = {
-                "id": "estadisticas__alumnos_postgrado@fcfm.escpostgrado"
-            }
-            headers = {
-                "Cookie": cookies
+                "id": estadistica_id
             }
             
-            response = requests.get(url, params=params, headers=headers)
+            response = self.session.get(url, params=params)
             
             if response.status_code == 200:
-                import re
                 # Buscar el token CSRF en el script de kernel
                 csrf_match = re.search(r'name="csrf"\s+value="([^"]+)"', response.text)
                 if csrf_match:
                     return csrf_match.group(1)
                     
-            logging.warning(f"No se pudo encontrar el token CSRF. Status code: {response.status_code}")
+            logging.warning(f"No se pudo encontrar el token CSRF para {estadistica_id}. Status code: {response.status_code}")
             return None
             
         except Exception as e:
-            logging.error(f"Error obteniendo CSRF: {str(e)}")
+            logging.error(f"Error obteniendo CSRF para {estadistica_id}: {str(e)}")
             return None
+
+    def export_path(self, estadistica_id):
+        """Ruta de la exportación de una unidad: <exports_folder>/<unidad>/alumnos_postgrado.csv"""
+        unidad = estadistica_id.split("@", 1)[-1]
+        return os.path.join(self.exports_folder, unidad, os.path.basename(self.students_csv_file))
         
-    def download_students_csv(self, cookies, csrf):
+    def download_students_csv(self, estadistica_id):
         """
-        Descarga el archivo CSV con la información de estudiantes.
+        Descarga el archivo CSV con la información de estudiantes de una unidad.
         
         Args:
-            cookies (str): String de cookies de la sesión activa
-            csrf (str): Token CSRF para la petición
+            estadistica_id (str): Id de la estadística a descargar
+            
+        La exportación se escribe primero en un archivo temporal, de modo que una descarga
+        fallida nunca reemplaza a la última exportación válida de la unidad.
+        
+        Returns:
+            str or None: Ruta del archivo descargado, None si la descarga falló
         """
-        logging.info("Iniciando descarga de archivo CSV")
+        logging.info(f"Iniciando descarga de archivo CSV de {estadistica_id}")
+        csrf = self.get_csrf_token(estadistica_id)
+        if not csrf:
+            return None
         url = self.url + Config.CSRF_ENDPOINT
         params = {
-            "id": "estadisticas__alumnos_postgrado@fcfm.escpostgrado",
+            "id": estadistica_id,
             "csrf": csrf,
             "accion": "bajar",
             "bajar": "csv"
         }
         
-        headers = {
-            "Cookie": cookies
-                    }
         try:
-            response = requests.get(url, 
-                                    params=params,
-                                    headers=headers
-                                    )
-            # Verificar si la solicitud fue exitosa
-            if response.status_code == 200:
+            response = self.session.get(url, params=params)
+            # Verificar si la solicitud fue exitosa (una página HTML, ej. el login, no es una exportación)
+            if response.status_code == 200 and not response.content.lstrip().startswith(b"<"):
                 # Guardar el archivo
-                with open(self.students_csv_file, "wb") as f:
+                output_path = self.export_path(estadistica_id)
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                with open(output_path + ".tmp", "wb") as f:
                     f.write(response.content)
-                logging.info("Archivo descargado exitosamente")
+                os.replace(output_path + ".tmp", output_path)
+                logging.info(f"Archivo de {estadistica_id} descargado exitosamente en {output_path}")
+                return output_path
             else:
-                logging.error(f"Error en la descarga. Código de estado: {response.status_code}")
+                detalle = "la respuesta no es un CSV" if response.status_code == 200 else f"Código de estado: {response.status_code}"
+                logging.error(f"Error en la descarga de {estadistica_id}. {detalle}")
             
         except Exception as e:
-            logging.error(f"Error durante la descarga: {str(e)}")
+            logging.error(f"Error durante la descarga de {estadistica_id}: {str(e)}")
+        return None
+
+    def download_all(self, cookies):
+        """
+        Descarga en paralelo las exportaciones de todas las unidades usando una sola sesión.
+        
+        Si la descarga de una unidad falla se usa su última exportación válida; unir sin
+        ella haría que todos sus estudiantes aparecieran como eliminados en el delta.
+        
+        Args:
+            cookies (str): String de cookies de la sesión activa
+            
+        Returns:
+            dict: Ruta de la exportación por id de estadística
+            
+        Raises:
+            RuntimeError: Si alguna unidad falló y no tiene una exportación anterior
+        """
+        self.session.headers["Cookie"] = cookies
+        with ThreadPoolExecutor(max_workers=Config.EXPORT_DOWNLOAD_WORKERS) as executor:
+            descargas = dict(zip(self.estadisticas_ids, executor.map(self.download_students_csv, self.estadisticas_ids)))
+        
+        paths = {}
+        for estadistica_id, path in descargas.items():
+            anterior = self.export_path(estadistica_id)
+            if path:
+                paths[estadistica_id] = path
+            elif os.path.exists(anterior):
+                fecha = datetime.fromtimestamp(os.path.getmtime(anterior)).strftime('%d-%m-%Y %H:%M')
+                logging.warning(f"Se usa la última exportación válida de {estadistica_id} ({fecha}): {anterior}")
+                paths[estadistica_id] = anterior
+        fallidas = [estadistica_id for estadistica_id in self.estadisticas_ids if estadistica_id not in paths]
+        if fallidas:
+            raise RuntimeError(f"No se pudo descargar la exportación de {fallidas} y no hay una exportación anterior")
+        return paths
+
+    def merge_exports(self, paths):
+        """
+        Une las exportaciones de todas las unidades en students_csv_file, agregando la
+        columna 'Unidad' y eliminando los estudiantes (RUT + Plan) repetidos entre unidades.
+        El resultado pasa por las particiones por cohorte (ver CohortPartitionStore).
+        
+        Args:
+            paths (dict): Ruta de la exportación por id de estadística
+        """
+        frames = []
+        for estadistica_id, path in paths.items():
+            df = pd.read_csv(path)
+            df["Unidad"] = estadistica_id.split("@", 1)[-1]
+            frames.append(df)
+        merged = pd.concat(frames, ignore_index=True)
+        total = len(merged)
+        merged = merged.drop_duplicates(subset=["RUT", "Plan"], keep="first")
+        repetidas = total - len(merged)
+        # Las cohortes cerradas se toman de su partición en caché para no reprocesarlas
+        merged = CohortPartitionStore().refresh(merged)
+        merged.to_csv(self.students_csv_file, index=False)
+        logging.info(f"Exportaciones unidas en {self.students_csv_file}: {len(merged)} filas "
+                     f"({repetidas} repetidas entre unidades)")
                    
     
     def run_workflow(self):
@@ -193,12 +273,17 @@ class UcampusEstudiantesPostgrado:
         Este método orquesta todo el proceso:
         1. Verificación de credenciales
         2. Inicio de sesión
-        3. Obtención de tokens y cookies
-        4. Descarga del archivo CSV
+        3. Obtención de cookies
+        4. Descarga en paralelo del CSV de cada unidad y unión en un solo archivo
         5. Limpieza de recursos
         """
         logging.info(f"************ Inicio del workflow {self.__class__.__name__} ************")
         try:
+            if self.mode == REPLAY:
+                archive = PageArchive(Config.RECORD_ARCHIVE, REPLAY)
+                archive.restore_export(self.students_csv_file)
+                archive.close()
+                return
             if not self.user or not self.password:
                 logging.error("Credenciales no encontradas en las variables de entorno. Finalizando el proceso.")
                 return
@@ -208,12 +293,17 @@ class UcampusEstudiantesPostgrado:
             
             # Obtener cookies y descargar archivo
             cookies = self.get_cookies()
-            csrf = self.get_csrf_token(cookies)
-            print(csrf)
-            self.download_students_csv(cookies,csrf)
+            paths = self.download_all(cookies)
+            self.merge_exports(paths)
+            if self.mode == RECORD:
+                archive = PageArchive(Config.RECORD_ARCHIVE, RECORD)
+                archive.save_export(self.students_csv_file)
+                archive.close()
             
         except Exception as e:
             logging.error(f"Error en workflow: {self.__class__.__name__}: {e}", exc_info=True)
+            # Sin exportación completa el delta marcaría estudiantes como eliminados: se detiene el Robot
+            raise
         finally:
             self.close()
             logging.info(f"************ Termino del workflow {self.__class__.__name__} ************")
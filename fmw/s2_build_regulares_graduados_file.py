@@ -7,17 +7,69 @@ from selenium.common.exceptions import NoSuchElementException, TimeoutException
 import logging
 import os
 import time
+import requests
 import pandas as pd
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
 from dotenv import load_dotenv
 from config import Config
+from delta_alumnos import DeltaAlumnosPostgrado
+from cohort_partitions import CohortMemoryStore
+from log_pipeline import StudentLogPipeline
+from record_replay import LIVE, RECORD, REPLAY, PageArchive, UcampusReplayServer, rut_key
 from datetime import datetime
 from typing import Optional, Dict, List
 
 load_dotenv()
 
+class SesionExpiradaError(Exception):
+    """Ucampus respondió con la página de login en vez de la página pedida"""
+
+
+class _SituacionesParser(HTMLParser):
+    """Extrae las filas de las tablas de situaciones como listas de celdas (clase, texto, texto de h2)"""
+    def __init__(self):
+        super().__init__()
+        self.rows: List[List[Dict]] = []
+        self._cell: Optional[Dict] = None
+        self._in_h2 = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self.rows.append([])
+        elif tag == 'td' and self.rows:
+            self._cell = {'class': dict(attrs).get('class') or '', 'text': '', 'h2': ''}
+            self.rows[-1].append(self._cell)
+        elif tag == 'h2':
+            self._in_h2 = True
+
+    def handle_endtag(self, tag):
+        if tag == 'td':
+            self._cell = None
+        elif tag == 'h2':
+            self._in_h2 = False
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell['text'] += data
+            if self._in_h2:
+                self._cell['h2'] += data
+
+
 class UcampusEstudiantesManager:
+    REGULARES_COLUMNS = [
+        'id', 'RUT', 'Codigo Plan', 'Nombre del Plan', 'Estado del Plan',
+        'Cohorte', 'Semestre', 'Fecha ingreso', 'Tesista', 'Profesor guia'
+    ]
+    GRADUADOS_COLUMNS = [
+        'id', 'RUT', 'Codigo Plan', 'Nombre del Plan', 'Estado del Plan',
+        'Cohorte', 'Semestre', 'Titulo examen', 'Fecha examen', 'Url tesis',
+        'Nota', 'Profesor guia', 'Permanencia'
+    ]
+
     def __init__(self, keep_web_alive: bool = True):
         load_dotenv()
+        self.keep_web_alive = keep_web_alive
         self._initialize_config()
         self._setup_logging()
         self._initialize_driver(keep_web_alive)
@@ -28,17 +80,40 @@ class UcampusEstudiantesManager:
         self.min_year = Config.MIN_COHORTE
         self.max_year = Config.MAX_COHORTE
         self.estudiantes_path = Config.STUDENTS_CSV
+        self.delta_path = Config.STUDENTS_DELTA
+        self.use_delta = Config.USE_DELTA
         self.regulares_path = Config.REGULARES
         self.graduados_path = Config.GRADUADOS
-        self.regulares_memory_path = Config.REGULARES_MEMORY
-        self.graduados_memory_path = Config.GRADUADOS_MEMORY
+        self.regulares_memory = CohortMemoryStore(Config.REGULARES_MEMORY, Config.REGULARES_MEMORY_FOLDER)
+        self.graduados_memory = CohortMemoryStore(Config.GRADUADOS_MEMORY, Config.GRADUADOS_MEMORY_FOLDER)
         self.min_cohorte_regulares = Config.COHORTE_MIN_REGULARES
         self.min_cohorte_graduados = Config.COHORTE_MIN_GRADUADOS
         self.filter_max_rows = Config.FILTER_MAX_ROWS
+        self.log_progress_every = Config.LOG_PROGRESS_EVERY
+        self.situaciones_prefetch_estados = Config.SITUACIONES_PREFETCH_ESTADOS
+        self.http_session: Optional[requests.Session] = None
+        self.prefetch_executor: Optional[ThreadPoolExecutor] = None
+        self.page_loads = 0
+        self.dead_letter_path = Config.DEAD_LETTER
+        self.dead_letter_max_intentos = Config.DEAD_LETTER_MAX_INTENTOS
+        self.retry_max_attempts = Config.RETRY_MAX_ATTEMPTS
+        self.retry_backoff = Config.RETRY_BACKOFF_SECONDS
         self.credentials = {
             'user': os.getenv("UCAMPUS_USER"),
             'password': os.getenv("UCAMPUS_PASSWORD")
         }
+        # Grabación / replay de las páginas de Ucampus para perfilar sin red
+        self.mode = Config.UCAMPUS_MODE
+        self.current_rut: Optional[str] = None
+        self.archive: Optional[PageArchive] = None
+        self.replay_server: Optional[UcampusReplayServer] = None
+        if self.mode != LIVE:
+            self.archive = PageArchive(Config.RECORD_ARCHIVE, self.mode)
+        if self.mode == REPLAY:
+            self.replay_server = UcampusReplayServer(self.archive)
+            self.url = self.replay_server.start()
+            self.use_delta = False
+            self.credentials = {'user': 'replay', 'password': 'replay'}
 
     def _setup_logging(self) -> None:
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -111,7 +186,7 @@ class UcampusEstudiantesManager:
         """Navega a la sección de boletines"""
         self.logger.info("Navegando a la sección de boletines...")
         try:
-            btn_boletines = (By.XPATH, "//a[contains(@href, 'https://ucampus.uchile.cl/m/fcfm_bia/') and contains(text(), 'Boletines')]")
+            btn_boletines = (By.XPATH, f"//a[contains(@href, '{self.url}/m/fcfm_bia/') and contains(text(), 'Boletines')]")
             self.waits['long'].until(EC.element_to_be_clickable(btn_boletines))
             self.driver.find_element(*btn_boletines).click()
             self.logger.info("Navegación a boletines exitosa")
@@ -146,35 +221,95 @@ class UcampusEstudiantesManager:
             seccion = (By.XPATH, "//h2[contains(text(), 'Exámenes de Grado y/o Título')]")
             self.waits['short'].until(EC.element_to_be_clickable(seccion))
             return True
-        except:
-            self.logger.info("No existe sección de tesis")
+        except TimeoutException:
+            self.logger.debug("No existe sección de tesis")
             return False
 
     def _extract_tesis_row_data(self, row) -> Dict:
         """Extrae la información de una fila de tesis cuando está en la sección de tesis"""
-        try:
-            return {
-                'professor': row.find_element("xpath", "./td[contains(@class, 'privado')]").text,
-                'nota': row.find_element("xpath", "./td[contains(@class, 'number')]").text,
-                'fecha_examen': row.find_element("xpath", "./td[contains(@class, 'date')]").text,
-                'titulo_examen': row.find_element("xpath", ".//a[contains(@href, 'cybertesis')]").text,
-                'url_examen': row.find_element("xpath", ".//a[contains(@href, 'cybertesis')]").get_attribute('href'),
-                'fecha_inscripcion': '',  # Campo nuevo para mantener consistencia
-                'tiene_inscripcion': False  # Indicador de si viene de inscripción
-            }
-        except Exception as e:
-            self.logger.error(f"Error extrayendo datos de fila: {str(e)}")
-            return {}
+        return {
+            'professor': row.find_element("xpath", "./td[contains(@class, 'privado')]").text,
+            'nota': row.find_element("xpath", "./td[contains(@class, 'number')]").text,
+            'fecha_examen': row.find_element("xpath", "./td[contains(@class, 'date')]").text,
+            'titulo_examen': row.find_element("xpath", ".//a[contains(@href, 'cybertesis')]").text,
+            'url_examen': row.find_element("xpath", ".//a[contains(@href, 'cybertesis')]").get_attribute('href'),
+            'fecha_inscripcion': '',  # Campo nuevo para mantener consistencia
+            'tiene_inscripcion': False  # Indicador de si viene de inscripción
+        }
 
-    def _get_info_from_situaciones(self, programa):
-        """Extrae la información de tesis desde la sección situaciones"""
+    def _start_http_session(self) -> None:
+        """Crea una sesión HTTP con las cookies del driver para descargar situaciones sin navegar"""
+        self.http_session = requests.Session()
+        self._sync_cookies()
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=Config.SITUACIONES_PREFETCH_WORKERS)
+
+    def _sync_cookies(self) -> None:
+        """Copia las cookies actuales del driver a la sesión HTTP (solo desde el hilo principal)"""
+        for cookie in self.driver.get_cookies():
+            self.http_session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'))
+
+    def _stop_http_session(self) -> None:
+        if self.prefetch_executor:
+            self.prefetch_executor.shutdown(wait=False, cancel_futures=True)
+            self.prefetch_executor = None
+        if self.http_session:
+            self.http_session.close()
+            self.http_session = None
+
+    def _get_situaciones_url(self, rut: str) -> Optional[str]:
+        """
+        Lee la URL de situaciones (situaciones?rut=) del boletín cargado, sin hacer click.
+        Retorna None si el boletín cargado no es el del RUT indicado (por ejemplo, si el
+        driver quedó en la página del estudiante anterior).
+        """
         try:
-            situaciones_btn = self.driver.find_element("xpath", "//a[contains(@href, 'situaciones?rut=') and text()='Situaciones']")
-            situaciones_btn.click()
-            
-            inscripcion = self.driver.find_element("xpath", f"//td[contains(.,'Inscripción del Tema de Tesis') and contains(.,'{programa}')]")
-            if inscripcion:
-                texto_completo = inscripcion.find_element("xpath", "./following-sibling::td[contains(@class, 'no-movil')]//h2").text
+            link = self.driver.find_element("xpath", "//a[contains(@href, 'situaciones?rut=') and text()='Situaciones']")
+            url = link.get_attribute('href')
+        except NoSuchElementException:
+            return None
+        clave = rut_key(rut)
+        if not url or clave is None or clave not in url:
+            self.logger.warning(f"El enlace de situaciones del boletín cargado no corresponde al RUT {rut}, se omite")
+            return None
+        return url
+
+    def _fetch_situaciones(self, url: str, rut: str) -> str:
+        response = self.http_session.get(url, timeout=20)
+        response.raise_for_status()
+        # Con la sesión expirada Ucampus redirige al login y responde 200
+        if 'name="password"' in response.text:
+            raise SesionExpiradaError(f"Sesión expirada al descargar situaciones de {rut}")
+        if self.mode == RECORD:
+            self.archive.save_page('situaciones', rut, response.text)
+        return response.text
+
+    def _prefetch_situaciones(self, row: pd.Series) -> Optional[Future]:
+        """
+        Descarga situaciones en segundo plano para los estudiantes que probablemente la necesiten
+        (Egresado, Regular sin tesis, ...) mientras se procesa el boletín.
+        """
+        if row.get('Estado del Plan') not in self.situaciones_prefetch_estados:
+            return None
+        if str(row.get('Tesista', '')).upper() == 'TRUE':
+            return None
+        url = self._get_situaciones_url(row['RUT'])
+        if not url or not self.prefetch_executor:
+            return None
+        self.page_loads += 1
+        return self.prefetch_executor.submit(self._fetch_situaciones, url, row['RUT'])
+
+    def _parse_situaciones(self, html: str, programa: str) -> Optional[Dict]:
+        """Busca la inscripción del tema de tesis del programa en el HTML de situaciones"""
+        parser = _SituacionesParser()
+        parser.feed(html)
+        for cells in parser.rows:
+            for i, cell in enumerate(cells):
+                if 'Inscripción del Tema de Tesis' not in cell['text'] or programa not in cell['text']:
+                    continue
+                detalle = next((c for c in cells[i + 1:] if 'no-movil' in c['class'] and c['h2']), None)
+                if detalle is None:
+                    return None
+                texto_completo = ' '.join(detalle['h2'].split())
                 
                 partes = texto_completo.split("Prof. Guía")
                 titulo = partes[0].strip().rstrip('.')
@@ -196,24 +331,46 @@ class UcampusEstudiantesManager:
                     'fecha_inscripcion': fecha_inscripcion,
                     'tiene_inscripcion': True  # Esto garantiza que se marque como tesista
                 }
-                    
+        return None
+
+    def _get_info_from_situaciones(self, programa: str, prefetch: Optional[Future] = None) -> Optional[Dict]:
+        """
+        Extrae la información de tesis desde la sección situaciones.
+
+        Usa la descarga anticipada si existe; si no, descarga la página directamente
+        por su URL. En ningún caso navega el driver fuera del boletín. Si la sesión HTTP
+        expiró se sincronizan las cookies del driver y se reintenta una vez; los demás
+        errores se propagan para que el estudiante quede como fallido.
+        """
+        try:
+            html = prefetch.result() if prefetch is not None else self._fetch_current_situaciones()
+        except SesionExpiradaError:
+            self.logger.warning("Sesión HTTP expirada, sincronizando cookies desde el driver")
+            self._sync_cookies()
+            html = self._fetch_current_situaciones()
+        if not html:
             return None
-                    
-        except Exception as e:
-            self.logger.error(f"Error obteniendo información de situaciones: {str(e)}")
+        return self._parse_situaciones(html, programa)
+
+    def _fetch_current_situaciones(self) -> Optional[str]:
+        """Descarga situaciones del estudiante cuyo boletín está cargado en el driver"""
+        url = self._get_situaciones_url(self.current_rut)
+        if not url:
             return None
-        finally:
-            self.driver.back()
+        self.page_loads += 1
+        return self._fetch_situaciones(url, self.current_rut)
 
-    def _get_tesis_info(self, programa: str) -> Optional[Dict]:
+    def _get_tesis_info(self, programa: str, situaciones_prefetch: Optional[Future] = None) -> Optional[Dict]:
         """
         Obtiene la información de tesis para un programa específico.
         
         Args:
             programa (str): Nombre del programa académico
+            situaciones_prefetch (Future, optional): Descarga anticipada de situaciones
             
         Returns:
-            Optional[Dict]: Diccionario con información de la tesis o None si no se encuentra
+            Optional[Dict]: Diccionario con información de la tesis o None si no se encuentra.
+            Los errores de carga o de lectura de la página se propagan.
             {
                 'professor': str,
                 'nota': str,
@@ -224,30 +381,25 @@ class UcampusEstudiantesManager:
                 'tiene_inscripcion': bool
             }
         """
-        try:
-            seccion_tesis = self._check_tesis_section()
-            if not seccion_tesis:
-                self.logger.info("No se encontró sección de tesis, buscando en situaciones...")
-                info_situaciones = self._get_info_from_situaciones(programa)
-                if info_situaciones:
-                    return info_situaciones
-                return None
-
-            target_table = self.driver.find_element(
-                "xpath", 
-                "//h2[contains(text(), 'Exámenes de Grado y/o Título')]/following::table[.//th[contains(text(), 'Examen / Título')]]"
-            )
-            rows = target_table.find_elements("xpath", ".//tbody/tr")
-
-            for row in rows:
-                if programa in row.text:
-                    return self._extract_tesis_row_data(row)
+        seccion_tesis = self._check_tesis_section()
+        if not seccion_tesis:
+            self.logger.debug("No se encontró sección de tesis, buscando en situaciones...")
+            info_situaciones = self._get_info_from_situaciones(programa, situaciones_prefetch)
+            if info_situaciones:
+                return info_situaciones
             return None
 
-        except Exception as e:
-            self.logger.error(f"Error obteniendo información de tesis: {str(e)}")
-            return None
-                
+        target_table = self.driver.find_element(
+            "xpath", 
+            "//h2[contains(text(), 'Exámenes de Grado y/o Título')]/following::table[.//th[contains(text(), 'Examen / Título')]]"
+        )
+        rows = target_table.find_elements("xpath", ".//tbody/tr")
+
+        for row in rows:
+            if programa in row.text:
+                return self._extract_tesis_row_data(row)
+        return None
+
     def _get_fecha_ingreso(self, cohorte: str, semestre: str) -> str:
         """
         Calcula la fecha de ingreso basada en la cohorte y el semestre
@@ -265,51 +417,66 @@ class UcampusEstudiantesManager:
             self.logger.error(f"Error calculando fecha de ingreso para cohorte {cohorte}: {e}")
             return ""
         
-    def _process_single_student(self, row: pd.Series, index: int, df: pd.DataFrame, process_type: str) -> None:
+    def _process_single_student(self, row: pd.Series, index: int, df: pd.DataFrame, process_type: str) -> Optional[Dict]:
+        """Busca al estudiante, actualiza el DataFrame y retorna la información de tesis encontrada"""
+        self.current_rut = row['RUT']
         self._search_student(row['RUT'])
-        tesis_info = self._get_tesis_info(row['Nombre del Plan'])
+        self.page_loads += 1
+        situaciones_prefetch = self._prefetch_situaciones(row)
+        tesis_info = self._get_tesis_info(row['Nombre del Plan'], situaciones_prefetch)
+        if self.mode == RECORD:
+            self.archive.save_page('boletin', row['RUT'], self.driver.page_source)
 
         if tesis_info:
-            self.logger.info(f" Información de tesis encontrada para {row['RUT']}")
-            self.logger.info(f" Profesor guía: {tesis_info.get('professor', 'No disponible')}")
-            self.logger.info(f" Nota: {tesis_info.get('nota', 'No disponible')}")
-            self.logger.info(f" Fecha defensa: {tesis_info.get('fecha_examen', 'No disponible')}")
-            self.logger.info(f" Titulo: {tesis_info.get('titulo_examen', 'No disponible')}")
             self._update_dataframe(df, index, tesis_info, process_type)
-        else:
-            self.logger.info(f"No se encontró información de tesis para {row['RUT']}")
+        return tesis_info
 
     def _update_dataframe(self, df: pd.DataFrame, index: int, tesis_info: Dict, process_type: str) -> None:
         """Actualiza el DataFrame con la información de tesis"""
-        try:
-            if process_type == 'graduados':
-                df.at[index, "Profesor guia"] = tesis_info.get('professor', '')
-                df.at[index, "Nota"] = tesis_info.get('nota', '')
-                df.at[index, "Fecha examen"] = tesis_info.get('fecha_examen', '')
-                df.at[index, "Titulo examen"] = tesis_info.get('titulo_examen', '')
-                df.at[index, "Url tesis"] = tesis_info.get('url_examen', '')
-                
-                if tesis_info.get('fecha_inscripcion'):  # Si viene de situaciones
-                    df.at[index, "Permanencia"] = self.calcular_permanencia(
-                        tesis_info['fecha_inscripcion'],
-                        int(df.at[index, 'Cohorte']),
-                        df.at[index, 'Semestre']
-                    )
-                elif tesis_info.get('fecha_examen'):  # Si viene de exámenes
-                    df.at[index, "Permanencia"] = self.calcular_permanencia(
-                        tesis_info['fecha_examen'],
-                        int(df.at[index, 'Cohorte']),
-                        df.at[index, 'Semestre']
-                    )
-            else:  # regulares
-                df.at[index, "Profesor guia"] = tesis_info.get('professor', '')
-                df.at[index, "Tesista"] = "TRUE" if tesis_info.get('professor') else "FALSE"
-
-        except Exception as e:
-            self.logger.error(f"Error actualizando DataFrame: {str(e)}")
+        if process_type == 'graduados':
+            df.at[index, "Profesor guia"] = tesis_info.get('professor', '')
+            df.at[index, "Nota"] = tesis_info.get('nota', '')
+            df.at[index, "Fecha examen"] = tesis_info.get('fecha_examen', '')
+            df.at[index, "Titulo examen"] = tesis_info.get('titulo_examen', '')
+            df.at[index, "Url tesis"] = tesis_info.get('url_examen', '')
+            
+            if tesis_info.get('fecha_inscripcion'):  # Si viene de situaciones
+                df.at[index, "Permanencia"] = self.calcular_permanencia(
+                    tesis_info['fecha_inscripcion'],
+                    int(df.at[index, 'Cohorte']),
+                    df.at[index, 'Semestre']
+                )
+            elif tesis_info.get('fecha_examen'):  # Si viene de exámenes
+                df.at[index, "Permanencia"] = self.calcular_permanencia(
+                    tesis_info['fecha_examen'],
+                    int(df.at[index, 'Cohorte']),
+                    df.at[index, 'Semestre']
+                )
+        else:  # regulares
+            df.at[index, "Profesor guia"] = tesis_info.get('professor', '')
+            df.at[index, "Tesista"] = "TRUE" if tesis_info.get('professor') else "FALSE"
+
+    @staticmethod
+    def _export_ids(df: pd.DataFrame) -> pd.Series:
+        """Genera el id RUT_CodigoPlan a partir de las columnas de la exportación"""
+        return df['RUT'].astype(str) + '_' + df['Plan'].str.split(' ', n=1).str[0]
 
     def _load_and_filter_estudiantes(self, estado_filter: List[str]) -> pd.DataFrame:
-        df = pd.read_csv(self.estudiantes_path)
+        if self.use_delta and os.path.exists(self.delta_path):
+            # Solo las filas agregadas o modificadas desde la exportación anterior
+            df = pd.read_csv(self.delta_path)
+            df = df[df['Tipo cambio'] != DeltaAlumnosPostgrado.ELIMINADO]
+            self.logger.info(f"Usando delta de exportación: {len(df)} filas agregadas o modificadas")
+            # Más los estudiantes pendientes en el archivo de fallidos, aunque no hayan cambiado
+            pendientes = self._load_dead_letter_ids()
+            if pendientes:
+                export = pd.read_csv(self.estudiantes_path)
+                ids = self._export_ids(export)
+                export = export.loc[ids.isin(pendientes) & ~ids.isin(set(self._export_ids(df)))]
+                self.logger.info(f"Estudiantes pendientes en archivo de fallidos: {len(export)}")
+                df = pd.concat([df, export], ignore_index=True)
+        else:
+            df = pd.read_csv(self.estudiantes_path)
         mask = df["Estado del Plan"].isin(estado_filter)
         return df[mask].copy()
 
@@ -361,6 +528,8 @@ class UcampusEstudiantesManager:
             # Asumiendo que tienes una ruta definida para el archivo CSV
             estados_regulares = ["Regular", "En Proceso de Graduación", "Postergación"]
             df_regulares = self._load_and_filter_estudiantes(estados_regulares)
+            if df_regulares.empty:
+                return pd.DataFrame(columns=self.REGULARES_COLUMNS)
             
             additional_columns = {
                 'Tesista': '',
@@ -369,6 +538,8 @@ class UcampusEstudiantesManager:
             }
             
             df_nuevos_regulares = self._process_dataframe(df_regulares, additional_columns)
+            if df_nuevos_regulares.empty:
+                return pd.DataFrame(columns=self.REGULARES_COLUMNS)
             
             # Calcular la fecha de ingreso para cada estudiante
             df_nuevos_regulares['Fecha ingreso'] = df_nuevos_regulares.apply(
@@ -387,11 +558,13 @@ class UcampusEstudiantesManager:
             df_nuevos_regulares = df_nuevos_regulares.loc[
                 df_nuevos_regulares['Cohorte'] >= self.min_cohorte_regulares
             ]
+            if self.mode == REPLAY:
+                # En replay se procesan exactamente los estudiantes grabados
+                df_nuevos_regulares = df_nuevos_regulares.loc[
+                    df_nuevos_regulares['RUT'].map(lambda rut: self.archive.has_page('boletin', rut))
+                ]
             
-            return df_nuevos_regulares[[
-                'id', 'RUT', 'Codigo Plan', 'Nombre del Plan', 'Estado del Plan', 
-                'Cohorte', 'Semestre', 'Fecha ingreso', 'Tesista', 'Profesor guia'
-            ]]
+            return df_nuevos_regulares[self.REGULARES_COLUMNS]
         
         except Exception as e:
             self.logger.error(f"Error construyendo DataFrame de regulares: {e}")
@@ -407,22 +580,37 @@ class UcampusEstudiantesManager:
         Returns:
             pd.DataFrame: DataFrame con la información procesada de estudiantes graduados
         """
-        # Leer base de datos existente
-        df_graduados_memory = pd.read_csv(self.graduados_memory_path)
         estados_graduados = ["Graduado", "Egresado"]
         df_graduados = self._load_and_filter_estudiantes(estados_graduados)
+        # Con el delta lo normal es que no haya graduados nuevos
+        if df_graduados.empty:
+            return pd.DataFrame(columns=self.GRADUADOS_COLUMNS)
         
         # Preparar columnas para comparación en df_graduados
         df_graduados = self._process_dataframe(df_graduados, additional_columns={})
+        if df_graduados.empty:
+            return pd.DataFrame(columns=self.GRADUADOS_COLUMNS)
         
-        # Crear conjunto de pares (RUT, Código Plan) existentes en la base de datos
-        pares_existentes = set(zip(df_graduados_memory['RUT'], df_graduados_memory['Codigo Plan']))
+        # Crear conjunto de pares (RUT, Código Plan) existentes en la base de datos, leyendo
+        # solo las particiones de las cohortes presentes
+        # (el código de plan se compara como texto: en memoria se lee como número)
+        cohortes = pd.to_numeric(df_graduados['Cohorte'], errors='coerce').dropna().astype(int).unique()
+        df_graduados_memory = self.graduados_memory.read(cohortes, columns=['RUT', 'Codigo Plan'])
+        pares_existentes = set(zip(df_graduados_memory['RUT'].astype(str), df_graduados_memory['Codigo Plan'].astype(str)))
         
         # Filtrar registros que no existen en la base de datos
-        mask = ~df_graduados.apply(lambda x: (x['RUT'], x['Codigo Plan']) in pares_existentes, axis=1)
+        mask = ~df_graduados.apply(lambda x: (str(x['RUT']), str(x['Codigo Plan'])) in pares_existentes, axis=1)
+        if 'Tipo cambio' in df_graduados.columns:
+            # Las filas modificadas (ej. Egresado -> Graduado) se reprocesan aunque ya estén en memoria
+            mask |= df_graduados['Tipo cambio'] == DeltaAlumnosPostgrado.MODIFICADO
+        if self.mode == REPLAY:
+            # En replay se procesan exactamente los estudiantes grabados
+            mask = df_graduados['RUT'].map(lambda rut: self.archive.has_page('boletin', rut))
         df_nuevos_graduados = df_graduados[mask].copy()
         logging.info(f"Total graduados {len(df_graduados)}")
         logging.info(f"Nuevos graduados {len(df_nuevos_graduados)}")
+        if df_nuevos_graduados.empty:
+            return pd.DataFrame(columns=self.GRADUADOS_COLUMNS)
 
         additional_columns = {
             'Titulo examen': '',
@@ -446,11 +634,7 @@ class UcampusEstudiantesManager:
             df_nuevos_graduados['Cohorte'] >= self.min_cohorte_graduados
         ]
         
-        return df_nuevos_graduados[[
-            'id', 'RUT', 'Codigo Plan', 'Nombre del Plan', 'Estado del Plan', 
-            'Cohorte', 'Semestre', 'Titulo examen', 'Fecha examen', 'Url tesis',
-            'Nota', 'Profesor guia', 'Permanencia'
-        ]]
+        return df_nuevos_graduados[self.GRADUADOS_COLUMNS]
 
     def calcular_permanencia(self, fecha_examen: str, cohorte: int, semestre: str) -> float:
         """
@@ -469,39 +653,156 @@ class UcampusEstudiantesManager:
         permanencia = (fecha_examen_dt - fecha_inicio).days / 365.25
         return round(permanencia, 2)
 
-    def process_student_data(self, df: pd.DataFrame, process_type: str) -> None:
+    def _process_rows(self, df: pd.DataFrame, indexes: List, process_type: str,
+                      log_pipeline: StudentLogPipeline, intento: int = 0) -> Dict:
+        """
+        Procesa las filas indicadas del DataFrame. 'intento' es 0 en la primera pasada
+        y el número de reintento en las siguientes.
+
+        Returns:
+            Dict: Excepción de cada índice cuyo procesamiento falló
+        """
+        total_students = len(indexes)
+        fallidos = {}
+        for processed_count, index in enumerate(indexes, start=1):
+            row = df.loc[index]
+            inicio = time.perf_counter()
+            self.page_loads = 0
+            
+            try:
+                tesis_info = self._process_single_student(row, index, df, process_type)
+                estado = 'ok' if tesis_info else 'sin_tesis'
+                log_pipeline.student(row['RUT'], row['Nombre del Plan'], estado, tesis_info,
+                                     time.perf_counter() - inicio, page_loads=self.page_loads, intento=intento)
+                
+            except Exception as e:
+                self.logger.error("Error procesando estudiante %s: %s", row['RUT'], e)
+                fallidos[index] = e
+                log_pipeline.student(row['RUT'], row['Nombre del Plan'], 'error',
+                                     duracion=time.perf_counter() - inicio, error=type(e).__name__,
+                                     page_loads=self.page_loads, intento=intento)
+            
+            if processed_count % self.log_progress_every == 0:
+                self.logger.info("Progreso: %d/%d (%.1f%%)", processed_count, total_students,
+                                 processed_count / total_students * 100)
+        return fallidos
+
+    def _restart_session(self) -> None:
+        """Reinicia el driver y la sesión HTTP, vuelve a iniciar sesión y navega a boletines"""
+        self._stop_http_session()
+        try:
+            self.driver.quit()
+        except Exception as e:
+            self.logger.warning(f"Error al cerrar el driver: {str(e)}")
+        self._initialize_driver(self.keep_web_alive)
+        self._initialize_waits()
+        self.log_in()
+        self._navigate_to_boletines()
+        self._start_http_session()
+
+    def _retry_failed(self, df: pd.DataFrame, fallidos: Dict, process_type: str,
+                      log_pipeline: StudentLogPipeline) -> Dict:
+        """
+        Reintenta los estudiantes fallidos con una sesión nueva y espera exponencial.
+
+        Returns:
+            Dict: Excepción de cada índice que siguió fallando tras todos los reintentos
+        """
+        for intento in range(1, self.retry_max_attempts + 1):
+            if not fallidos:
+                break
+            espera = self.retry_backoff * 2 ** (intento - 1)
+            self.logger.info(f"Reintento {intento}/{self.retry_max_attempts} de {len(fallidos)} estudiantes "
+                             f"en {espera:.0f} segundos")
+            time.sleep(espera)
+            try:
+                self._restart_session()
+            except Exception as e:
+                self.logger.error(f"Error reiniciando la sesión para reintentos: {e}")
+                continue
+            fallidos = self._process_rows(df, list(fallidos), process_type, log_pipeline, intento)
+        return fallidos
+
+    def _update_dead_letter(self, df: pd.DataFrame, fallidos: Dict, process_type: str) -> None:
+        """
+        Actualiza el archivo de fallidos: quita los estudiantes que se procesaron bien en
+        esta ejecución y agrega (o incrementa los intentos de) los que siguen fallando.
+        """
+        columnas = ['id', 'RUT', 'Codigo Plan', 'Tipo', 'Error', 'Detalle', 'Intentos', 'Ultimo intento']
+        if os.path.exists(self.dead_letter_path):
+            dead_letter = pd.read_csv(self.dead_letter_path, dtype={'Codigo Plan': str})
+        else:
+            dead_letter = pd.DataFrame(columns=columnas)
+
+        previos = dead_letter.set_index('id')['Intentos'].to_dict()
+        dead_letter = dead_letter.loc[~dead_letter['id'].isin(set(df['id']))]
+        ahora = datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+        nuevos = pd.DataFrame([{
+            'id': df.at[index, 'id'],
+            'RUT': df.at[index, 'RUT'],
+            'Codigo Plan': str(df.at[index, 'Codigo Plan']),
+            'Tipo': process_type,
+            'Error': type(error).__name__,
+            'Detalle': str(error)[:500],
+            'Intentos': int(previos.get(df.at[index, 'id'], 0)) + 1,
+            'Ultimo intento': ahora,
+        } for index, error in fallidos.items()], columns=columnas)
+
+        dead_letter = pd.concat([dead_letter, nuevos], ignore_index=True)
+        dead_letter.to_csv(self.dead_letter_path, index=False)
+        self.logger.info(f"Archivo de fallidos actualizado en {self.dead_letter_path}: "
+                         f"{len(nuevos)} pendientes de {process_type}, {len(dead_letter)} en total")
+
+    def _load_dead_letter_ids(self) -> set:
+        """
+        Ids del archivo de fallidos que deben reintentarse. Los que ya superaron
+        Config.DEAD_LETTER_MAX_INTENTOS se mantienen en el archivo para revisión
+        manual, pero no se vuelven a procesar.
+        """
+        if not os.path.exists(self.dead_letter_path):
+            return set()
+        dead_letter = pd.read_csv(self.dead_letter_path)
+        agotados = dead_letter['Intentos'] >= self.dead_letter_max_intentos
+        if agotados.any():
+            self.logger.warning(f"{agotados.sum()} estudiantes del archivo de fallidos alcanzaron "
+                                f"{self.dead_letter_max_intentos} intentos y no se reintentan; "
+                                f"revisar manualmente en {self.dead_letter_path}")
+        return set(dead_letter.loc[~agotados, 'id'])
+
+    def process_student_data(self, df: pd.DataFrame, process_type: str) -> List:
         """
         Procesa los datos de cada estudiante del DataFrame.
         
+        Los estudiantes que fallan se reintentan al final con una sesión nueva; los que
+        siguen fallando quedan registrados en el archivo de fallidos.
+        
         Args:
             df (pd.DataFrame): DataFrame con la información de estudiantes a procesar
             process_type (str): Tipo de procesamiento ('regulares' o 'graduados')
+            
+        Returns:
+            List: Índices del DataFrame que no se pudieron procesar
         """
         total_students = len(df)
         self.logger.info(f"Iniciando procesamiento de {total_students} estudiantes - Tipo: {process_type}")
         
         self._navigate_to_boletines()
-        processed_count = 0
+        # Un registro JSON por estudiante, escrito por un hilo aparte para no frenar el scraping
+        log_pipeline = StudentLogPipeline(self.logger)
+        log_pipeline.start()
+        self._start_http_session()
         
-        for index, row in df.iterrows():
-            processed_count += 1
-            self.logger.info(f"Procesando estudiante {processed_count}/{total_students}")
-            self.logger.info(f"RUT: {row['RUT']} - Programa: {row['Nombre del Plan']}")
-            
-            try:
-                self._process_single_student(row, index, df, process_type)
-                self.logger.info(f"Estudiante procesado exitosamente: {row['RUT']}")
-                
-                # Logging de progreso cada 10 estudiantes
-                if processed_count % 10 == 0:
-                    self.logger.info(f"Progreso: {processed_count}/{total_students} ({(processed_count/total_students)*100:.1f}%)")
-                
-            except Exception as e:
-                self.logger.error(f"Error procesando estudiante {row['RUT']}: {e}")
+        try:
+            fallidos = self._process_rows(df, list(df.index), process_type, log_pipeline)
+            fallidos = self._retry_failed(df, fallidos, process_type, log_pipeline)
+        finally:
+            self._stop_http_session()
+            log_pipeline.stop()
+        if self.mode != REPLAY:
+            self._update_dead_letter(df, fallidos, process_type)
         self._save_progress(df, process_type)
-        self.logger.info(f"Procesamiento completado. Total estudiantes: {total_students}")
-
-    
+        self.logger.info(f"Procesamiento completado. Total estudiantes: {total_students} - Fallidos: {len(fallidos)}")
+        return list(fallidos)
 
     def _save_progress(self, df: pd.DataFrame, process_type: str) -> None:
         output_path = self.regulares_path if process_type == 'regulares' else self.graduados_path
@@ -512,31 +813,21 @@ class UcampusEstudiantesManager:
             self.logger.error(f"Error guardando progreso en {output_path}: {e}")
             raise
 
-    def _merge_and_save_memory(self, new_df: pd.DataFrame, db_path: str) -> None:
+    def _merge_and_save_memory(self, new_df: pd.DataFrame, store: CohortMemoryStore) -> None:
         """
         Combina el nuevo DataFrame con la base de datos existente y guarda el resultado.
         
+        Solo se leen y reescriben las particiones de las cohortes de new_df. Se conserva
+        el registro nuevo para que las filas modificadas reemplacen a las anteriores.
+        
         Args:
             new_df (pd.DataFrame): DataFrame con nuevos registros
-            db_path (str): Ruta al archivo de base de datos
+            store (CohortMemoryStore): Memoria particionada por cohorte
         """
         try:
-            # Leer base de datos existente
-            if os.path.exists(db_path):
-                db_df = pd.read_csv(db_path)
-                # Combinar DataFrames existentes con nuevos
-                merged_df = pd.concat([db_df, new_df], ignore_index=True)
-                # Eliminar duplicados basados en 'id' si existe, sino en todos los campos
-                merged_df = merged_df.drop_duplicates(subset=['id'] if 'id' in merged_df.columns else None)
-            else:
-                merged_df = new_df
-                
-            # Guardar resultado
-            merged_df.to_csv(db_path, index=False)
-            self.logger.info(f"Base de datos actualizada exitosamente en {db_path}")
-            
+            store.upsert(new_df, key='id')
         except Exception as e:
-            self.logger.error(f"Error al combinar y guardar base de datos en {db_path}: {e}")
+            self.logger.error(f"Error al combinar y guardar base de datos en {store.folder}: {e}")
             raise
 
     
@@ -560,8 +851,10 @@ class UcampusEstudiantesManager:
             graduados_df = self.build_graduados_df()
             self.logger.info(f"Total estudiantes graduados a procesar: {len(graduados_df)}")
             if not graduados_df.empty:
-                self.process_student_data(graduados_df, 'graduados')
-                self._merge_and_save_memory(graduados_df, self.graduados_memory_path)
+                fallidos = self.process_student_data(graduados_df, 'graduados')
+                # Los fallidos quedan fuera de memoria para que se vuelvan a procesar
+                if self.mode != REPLAY:
+                    self._merge_and_save_memory(graduados_df.drop(index=fallidos), self.graduados_memory)
             else:
                 self.logger.info("No hay nuevos estudiantes graduados para procesar")
             """
@@ -570,11 +863,14 @@ class UcampusEstudiantesManager:
             regulares_df = self.build_regulares_df()
             self.logger.info(f"Total estudiantes regulares a procesar: {len(regulares_df)}")
             if not regulares_df.empty:
-                self.process_student_data(regulares_df, 'regulares')
-                self._merge_and_save_memory(regulares_df, self.regulares_memory_path)
+                fallidos = self.process_student_data(regulares_df, 'regulares')
+                if self.mode != REPLAY:
+                    self._merge_and_save_memory(regulares_df.drop(index=fallidos), self.regulares_memory)
             else:
                 self.logger.info("No hay nuevos estudiantes regulares para procesar")
                 """
+            if self.use_delta and self.mode != REPLAY:
+                DeltaAlumnosPostgrado().commit_snapshot()
         except Exception as e:
             self.logger.error(f"Error en workflow: {e}", exc_info=True)
             raise
@@ -582,6 +878,10 @@ class UcampusEstudiantesManager:
             execution_time = time.time() - start_time
             self.logger.info(f"Tiempo total de ejecución: {execution_time:.2f} segundos")
             self.driver.quit()
+            if self.archive:
+                self.archive.close()
+            if self.replay_server:
+                self.replay_server.stop()
             self.logger.info(f"=== Workflow {self.__class__.__name__} finalizado ===")
 
 
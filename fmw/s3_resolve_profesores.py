@@ -0,0 +1,297 @@
+import pandas as pd
+import logging
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from config import Config
+from reference_data import ReferenceDataLoader
+from cohort_partitions import CohortMemoryStore
+from typing import Dict, List, Optional, Set, Tuple
+
+# Configuración del logger
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def normalizar_nombre(nombre: str) -> List[str]:
+    """Quita tildes, puntos y mayúsculas y retorna los tokens del nombre"""
+    if not isinstance(nombre, str):
+        return []
+    nombre = unicodedata.normalize('NFKD', nombre)
+    nombre = ''.join(c for c in nombre if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', nombre.lower()).split()
+
+
+class ProfesoresIndex:
+    """
+    Índice invertido en memoria sobre el catálogo de profesores.
+
+    Los nombres del catálogo se descomponen en tokens y trigramas de caracteres;
+    cada trigrama apunta al conjunto de profesores que lo contienen. Para resolver
+    un nombre solo se comparan los candidatos que comparten trigramas con él
+    (blocking), en vez de compararlo contra todo el catálogo.
+
+    Internamente cada profesor se identifica por su posición en el catálogo, pero
+    hacia afuera se usa una llave estable: el 'Rut' si existe y, si no, el
+    'Nombre ucampus'. Así las resoluciones de distintas ejecuciones son comparables
+    aunque se agreguen o quiten filas del catálogo. Un Rut repetido en el catálogo
+    no identifica a nadie, por lo que esas filas usan el nombre.
+
+    Los candidatos se puntúan alineando nombres con nombres y apellidos con
+    apellidos; una parte que no coincide descarta al candidato. La confianza es la
+    ventaja del mejor candidato sobre el siguiente, de modo que un nombre ambiguo
+    queda sin resolver en vez de asignarse al primero que aparezca.
+
+    Attributes:
+        catalogo (pd.DataFrame): Catálogo de profesores con la columna 'Nombre ucampus'
+        max_candidatos (int): Candidatos que se evalúan por nombre tras el blocking
+    """
+    PARTICULAS = {'de', 'del', 'la', 'las', 'los', 'da', 'di', 'van', 'von', 'san', 'santa', 'mc', 'mac'}
+    # Peso de cada parte del nombre en el puntaje; las iniciales pesan menos
+    PESO_NOMBRE, PESO_OTRO_NOMBRE, PESO_PATERNO, PESO_MATERNO, PESO_INICIAL = 0.8, 0.3, 1.0, 0.5, 0.3
+
+    def __init__(self, catalogo: pd.DataFrame, columna_nombre: str = 'Nombre ucampus', max_candidatos: int = 10):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.catalogo = catalogo.reset_index(drop=True)
+        self.columna_nombre = columna_nombre
+        self.max_candidatos = max_candidatos
+        self.claves: List[str] = self._claves()
+        self.tokens: List[List[str]] = []
+        self.partes: List[List[Tuple[List[str], Optional[str], Optional[str]]]] = []
+        self.trigramas: Dict[str, Set[int]] = defaultdict(set)
+        self._build()
+
+    def _claves(self) -> List[str]:
+        """Rut de cada profesor o, si falta o está repetido en el catálogo, su nombre"""
+        nombres = self.catalogo[self.columna_nombre].astype('string').str.strip()
+        if 'Rut' not in self.catalogo.columns:
+            return nombres.tolist()
+        ruts = self.catalogo['Rut'].astype('string').str.strip().replace('', pd.NA)
+        repetidos = ruts.notna() & ruts.duplicated(keep=False)
+        if repetidos.any():
+            detalle = '; '.join(f"{rut}: {', '.join(grupo)}" for rut, grupo in nombres[repetidos].groupby(ruts[repetidos]))
+            self.logger.warning(f"Ruts repetidos en el catálogo de profesores, se usa el nombre como llave: {detalle}")
+            ruts = ruts.mask(repetidos)
+        return ruts.fillna(nombres).tolist()
+
+    @classmethod
+    def _tokens(cls, nombre: str) -> List[str]:
+        """Tokens normalizados, uniendo las partículas al apellido que sigue ("de la fuente" -> "delafuente")"""
+        tokens, prefijo = [], ''
+        normalizados = normalizar_nombre(nombre)
+        for i, token in enumerate(normalizados):
+            if token in cls.PARTICULAS and i < len(normalizados) - 1 and i > 0:
+                prefijo += token
+                continue
+            tokens.append(prefijo + token)
+            prefijo = ''
+        return tokens
+
+    @staticmethod
+    def _partes(tokens: List[str]) -> List[Tuple[List[str], Optional[str], Optional[str]]]:
+        """
+        Interpretaciones posibles de un nombre como (nombres, apellido paterno, apellido materno).
+
+        La forma habitual es "Nombres Paterno Materno"; con tres tokens también se
+        considera "Nombre Nombre Paterno" (ej. "Carlos Joaquín Barrera"), y si el
+        penúltimo token es una inicial (ej. "Sergio D. Moraga") solo esta última.
+        """
+        if not tokens:
+            return []
+        if len(tokens) == 1:
+            return [(tokens, None, None)]
+        if len(tokens) == 2:
+            return [(tokens[:1], tokens[1], None)]
+        sin_materno = (tokens[:-1], tokens[-1], None)
+        if len(tokens[-2]) == 1:
+            return [sin_materno]
+        partes = [(tokens[:-2], tokens[-2], tokens[-1])]
+        if len(tokens) == 3 and len(tokens[-1]) > 1:
+            partes.append(sin_materno)
+        return partes
+
+    @staticmethod
+    def _trigramas(token: str) -> Set[str]:
+        token = f"^{token}$"
+        return {token[i:i + 3] for i in range(len(token) - 2)}
+
+    def _build(self) -> None:
+        for id_profesor, nombre in enumerate(self.catalogo[self.columna_nombre]):
+            tokens = self._tokens(nombre)
+            self.tokens.append(tokens)
+            self.partes.append(self._partes(tokens))
+            for token in tokens:
+                # Las iniciales no aportan al blocking, solo al puntaje
+                if len(token) > 1:
+                    for trigrama in self._trigramas(token):
+                        self.trigramas[trigrama].add(id_profesor)
+
+    @staticmethod
+    def _similitud_token(a: str, b: str) -> float:
+        if a == b:
+            return 1.0
+        if len(a) == 1 or len(b) == 1:
+            # Inicial frente a nombre completo, ej. "G." frente a "González"
+            return 0.9 if a[0] == b[0] else 0.0
+        ratio = SequenceMatcher(None, a, b).ratio()
+        # Solo se aceptan diferencias menores (tildes mal puestas, typos); "fernandez"/"fernanda" no
+        return ratio if ratio >= 0.85 else 0.0
+
+    def _puntaje_partes(self, a: Tuple[List[str], Optional[str], Optional[str]],
+                        b: Tuple[List[str], Optional[str], Optional[str]]) -> float:
+        """
+        Compara nombre con nombre y apellido con apellido, posición a posición. Si una
+        parte presente en ambos no coincide (incluida una inicial distinta, ej. "Lara A."
+        frente a "Lara B.") el puntaje es 0. Las partes ausentes en alguno no cuentan.
+        """
+        comparaciones = []
+        for i, (nombre_a, nombre_b) in enumerate(zip(a[0], b[0])):
+            peso = self.PESO_NOMBRE if i == 0 else self.PESO_OTRO_NOMBRE
+            comparaciones.append((nombre_a, nombre_b, peso))
+        if a[1] is None or b[1] is None:
+            # Sin apellido paterno no hay cómo distinguir a dos profesores con el mismo nombre
+            return 0.0
+        comparaciones.append((a[1], b[1], self.PESO_PATERNO))
+        if a[2] is not None and b[2] is not None:
+            comparaciones.append((a[2], b[2], self.PESO_MATERNO))
+
+        total, pesos = 0.0, 0.0
+        for token_a, token_b, peso in comparaciones:
+            similitud = self._similitud_token(token_a, token_b)
+            if similitud == 0:
+                return 0.0
+            if len(token_a) == 1 or len(token_b) == 1:
+                peso *= self.PESO_INICIAL
+            total += peso * similitud
+            pesos += peso
+        return total / pesos
+
+    def _puntaje(self, tokens: List[str], id_profesor: int) -> float:
+        return max((self._puntaje_partes(a, b) for a in self._partes(tokens) for b in self.partes[id_profesor]),
+                   default=0.0)
+
+    def _candidatos(self, tokens: List[str]) -> List[int]:
+        conteo: Dict[int, int] = defaultdict(int)
+        for token in tokens:
+            if len(token) > 1:
+                for trigrama in self._trigramas(token):
+                    for id_profesor in self.trigramas.get(trigrama, ()):
+                        conteo[id_profesor] += 1
+        return sorted(conteo, key=conteo.get, reverse=True)[:self.max_candidatos]
+
+    def _resolve_posicion(self, nombre: str) -> Tuple[Optional[int], float]:
+        """
+        Mejor candidato y confianza. La confianza es la diferencia entre el mejor puntaje
+        y el mejor puntaje de otro profesor incompatible con él: si dos profesores empatan (ej. "C. Andrade"
+        frente a "Cristián Andrade M." y "Carolina Andrade P.") no se asigna ninguno.
+        """
+        tokens = self._tokens(nombre)
+        mejor_por_clave: Dict[str, Tuple[float, int]] = {}
+        for id_profesor in self._candidatos(tokens):
+            puntaje = self._puntaje(tokens, id_profesor)
+            clave = self.claves[id_profesor]
+            if puntaje > mejor_por_clave.get(clave, (0.0, -1))[0]:
+                mejor_por_clave[clave] = (puntaje, id_profesor)
+        ranking = sorted(mejor_por_clave.values(), reverse=True)
+        if not ranking:
+            return None, 0.0
+        mejor, id_profesor = ranking[0]
+        # Un candidato compatible con el mejor (ej. "Alberto De la Fuente S." y
+        # "Alberto De la Fuente Stranger", sin Rut) es la misma persona repetida en el catálogo
+        rivales = [p for p, otro in ranking[1:] if self._puntaje(self.tokens[id_profesor], otro) == 0]
+        segundo = rivales[0] if rivales else 0.0
+        confianza = round(mejor - segundo, 3)
+        if confianza <= 0:
+            return None, 0.0
+        return id_profesor, confianza
+
+    def resolve(self, nombre: str) -> Tuple[Optional[str], float]:
+        """
+        Resuelve un nombre al profesor del catálogo más parecido.
+
+        Args:
+            nombre (str): Nombre tal como viene de Ucampus
+
+        Returns:
+            Tuple[Optional[str], float]: Llave estable del profesor (Rut o Nombre ucampus)
+            y confianza entre 0 y 1
+        """
+        posicion, confianza = self._resolve_posicion(nombre)
+        return (self.claves[posicion] if posicion is not None else None), confianza
+
+    def resolve_many(self, nombres: pd.Series) -> pd.DataFrame:
+        """
+        Resuelve en bloque una serie de nombres. Cada nombre distinto se resuelve una sola vez.
+
+        Returns:
+            pd.DataFrame: Columnas 'Id profesor' (llave estable), 'Profesor catalogo' y
+            'Confianza', alineadas con el índice de la serie de entrada
+        """
+        unicos = pd.Series(nombres.dropna().unique())
+        resueltos = {nombre: self._resolve_posicion(nombre) for nombre in unicos}
+        posiciones = nombres.map(lambda n: resueltos.get(n, (None, 0.0))[0])
+        confianza = nombres.map(lambda n: resueltos.get(n, (None, 0.0))[1])
+        return pd.DataFrame({
+            'Id profesor': posiciones.map(lambda i: self.claves[int(i)] if pd.notna(i) else pd.NA).astype('string'),
+            'Profesor catalogo': posiciones.map(lambda i: self.catalogo.at[int(i), self.columna_nombre] if pd.notna(i) else ''),
+            'Confianza': confianza.astype(float),
+        }, index=nombres.index)
+
+
+class ResolverProfesoresGuia:
+    """
+    Asocia el 'Profesor guia' de graduados y regulares a un profesor del catálogo.
+
+    Construye el índice una sola vez y resuelve todos los nombres de los archivos
+    de memoria en bloque. Las resoluciones con confianza menor a
+    Config.PROFESOR_MIN_CONFIANZA quedan sin id para revisión manual.
+    """
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.profesores_path = Config.TEMPLATE_PROFESORES
+        self.memory_stores = [
+            CohortMemoryStore(Config.GRADUADOS_MEMORY, Config.GRADUADOS_MEMORY_FOLDER),
+            CohortMemoryStore(Config.REGULARES_MEMORY, Config.REGULARES_MEMORY_FOLDER),
+        ]
+        self.output_path = Config.PROFESORES_RESUELTOS
+        self.min_confianza = Config.PROFESOR_MIN_CONFIANZA
+
+    def build_resoluciones_df(self, index: ProfesoresIndex, df: pd.DataFrame) -> pd.DataFrame:
+        # Algunos estudiantes tienen más de un profesor guía ("A, B", "A y Co-Guía B - C")
+        df = df[['id', 'Profesor guia']].copy()
+        df['Profesor guia'] = (df['Profesor guia'].astype(str)
+                               .str.replace(r'(?i)co-gu[ií]a', '', regex=True)
+                               .str.split(r',|\s+y\s+|\s+-\s+', regex=True))
+        df = df.explode('Profesor guia', ignore_index=True)
+        df['Profesor guia'] = df['Profesor guia'].str.strip()
+        df = df.loc[~df['Profesor guia'].isin(['', 'nan'])]
+        resueltos = index.resolve_many(df['Profesor guia'])
+        resultado = pd.concat([df, resueltos], axis=1)
+        baja_confianza = resultado['Confianza'] < self.min_confianza
+        resultado.loc[baja_confianza, 'Id profesor'] = pd.NA
+        resultado.loc[baja_confianza, 'Profesor catalogo'] = ''
+        return resultado
+
+    def run_workflow(self) -> None:
+        self.logger.info(f"************ Inicio del workflow {self.__class__.__name__} ************")
+        catalogo = ReferenceDataLoader().load_profesores(self.profesores_path)
+        index = ProfesoresIndex(catalogo)
+        self.logger.info(f"Índice de profesores construido: {len(catalogo)} profesores, {len(index.trigramas)} trigramas")
+
+        frames = [store.read() for store in self.memory_stores]
+        frames = [df for df in frames if 'Profesor guia' in df.columns]
+        if not frames:
+            self.logger.info("No hay archivos de memoria con profesor guía para resolver")
+            return
+        resultado = self.build_resoluciones_df(index, pd.concat(frames, ignore_index=True))
+        resultado.to_csv(self.output_path, index=False)
+
+        sin_resolver = resultado['Id profesor'].isna().sum()
+        self.logger.info(f"Profesores guía resueltos: {len(resultado) - sin_resolver}/{len(resultado)}")
+        self.logger.info(f"Resoluciones guardadas en {self.output_path}")
+        self.logger.info(f"************ Termino del workflow {self.__class__.__name__} ************")
+
+
+if __name__ == "__main__":
+    ResolverProfesoresGuia().run_workflow()
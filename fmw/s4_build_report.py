@@ -0,0 +1,130 @@
+import pandas as pd
+import numpy as np
+import logging
+import os
+import time
+from openpyxl import Workbook
+from config import Config
+from cohort_partitions import CohortMemoryStore
+from typing import Dict, List, Tuple
+
+# Configuración del logger
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+class ReporteWorktray:
+    """
+    Llena el worktray con los indicadores por programa y cohorte.
+
+    Los indicadores se calculan con groupbys vectorizados sobre la memoria de
+    graduados y regulares, particionada por cohorte. Los agregados se guardan en
+    caché por cohorte junto a la firma (mtime, tamaño) de sus particiones, de modo
+    que solo se leen y recalculan las cohortes cuyas particiones cambiaron. El
+    Excel se escribe con el modo write-only de openpyxl para mantener acotado el
+    uso de memoria.
+    """
+    KEYS = ['Nombre del Plan', 'Cohorte']
+    COLUMNS = [
+        'Nombre del Plan', 'Cohorte', 'Total', 'Graduados', 'Egresados', 'Regulares',
+        'Tesistas', 'Ratio tesistas', 'Tasa graduacion',
+        'Permanencia promedio', 'Permanencia p50', 'Permanencia p90'
+    ]
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.worktray_path = Config.WORKTRAY
+        self.graduados_memory = CohortMemoryStore(Config.GRADUADOS_MEMORY, Config.GRADUADOS_MEMORY_FOLDER)
+        self.regulares_memory = CohortMemoryStore(Config.REGULARES_MEMORY, Config.REGULARES_MEMORY_FOLDER)
+        self.cache_path = Config.REPORT_CACHE
+        self.sheet_name = Config.REPORT_SHEET
+
+    def _load(self, cohorte: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Lee solo las columnas necesarias de las particiones de una cohorte"""
+        graduados = self.graduados_memory.read([cohorte], columns=self.KEYS + ['Estado del Plan', 'Permanencia'])
+        regulares = self.regulares_memory.read([cohorte], columns=self.KEYS + ['Tesista'])
+        graduados['Permanencia'] = pd.to_numeric(graduados['Permanencia'], errors='coerce')
+        graduados['es_graduado'] = graduados['Estado del Plan'].eq('Graduado')
+        graduados['es_egresado'] = graduados['Estado del Plan'].eq('Egresado')
+        regulares['es_tesista'] = regulares['Tesista'].astype(str).str.upper().eq('TRUE')
+        return graduados, regulares
+
+    def _aggregate(self, graduados: pd.DataFrame, regulares: pd.DataFrame) -> pd.DataFrame:
+        """Calcula los indicadores de una partición de cohortes"""
+        g = graduados.groupby(self.KEYS)
+        grad_agg = g.agg(
+            Graduados=('es_graduado', 'sum'),
+            Egresados=('es_egresado', 'sum'),
+            **{'Permanencia promedio': ('Permanencia', 'mean')}
+        )
+        permanencia = g['Permanencia'].quantile([0.5, 0.9]).unstack()
+        grad_agg['Permanencia p50'] = permanencia.get(0.5)
+        grad_agg['Permanencia p90'] = permanencia.get(0.9)
+
+        reg_agg = regulares.groupby(self.KEYS).agg(
+            Regulares=('es_tesista', 'size'),
+            Tesistas=('es_tesista', 'sum')
+        )
+
+        agg = grad_agg.join(reg_agg, how='outer')
+        counts = ['Graduados', 'Egresados', 'Regulares', 'Tesistas']
+        agg[counts] = agg[counts].fillna(0).astype(int)
+        agg['Total'] = agg['Graduados'] + agg['Egresados'] + agg['Regulares']
+        agg['Ratio tesistas'] = (agg['Tesistas'] / agg['Regulares'].replace(0, np.nan)).round(3)
+        agg['Tasa graduacion'] = (agg['Graduados'] / agg['Total'].replace(0, np.nan)).round(3)
+        for col in ['Permanencia promedio', 'Permanencia p50', 'Permanencia p90']:
+            agg[col] = agg[col].astype(float).round(2)
+        return agg.reset_index()[self.COLUMNS]
+
+    def build_indicadores_df(self) -> pd.DataFrame:
+        """
+        Construye la tabla de indicadores reutilizando los agregados en caché de las
+        cohortes cuyas particiones no cambiaron desde la última ejecución.
+        """
+        cache: Dict[int, Tuple[Tuple, pd.DataFrame]] = {}
+        if os.path.exists(self.cache_path):
+            cache = pd.read_pickle(self.cache_path)
+
+        cohortes = sorted(set(self.graduados_memory.cohortes()) | set(self.regulares_memory.cohortes()))
+
+        partes: List[pd.DataFrame] = []
+        nuevo_cache: Dict[int, Tuple[Tuple, pd.DataFrame]] = {}
+        recalculadas = 0
+        for cohorte in cohortes:
+            firma = (self.graduados_memory.signature(cohorte), self.regulares_memory.signature(cohorte))
+            if cohorte in cache and cache[cohorte][0] == firma:
+                agg = cache[cohorte][1]
+            else:
+                agg = self._aggregate(*self._load(cohorte))
+                recalculadas += 1
+            nuevo_cache[cohorte] = (firma, agg)
+            partes.append(agg)
+
+        self.logger.info(f"Cohortes recalculadas: {recalculadas}/{len(cohortes)}")
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        pd.to_pickle(nuevo_cache, self.cache_path)
+
+        if not partes:
+            return pd.DataFrame(columns=self.COLUMNS)
+        return pd.concat(partes, ignore_index=True).sort_values(self.KEYS, ignore_index=True)
+
+    def write_worktray(self, indicadores: pd.DataFrame) -> None:
+        """Escribe los indicadores fila a fila con un libro write-only"""
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(self.sheet_name)
+        ws.append(self.COLUMNS)
+        for row in indicadores.itertuples(index=False, name=None):
+            ws.append([None if pd.isna(v) else v.item() if hasattr(v, 'item') else v for v in row])
+        wb.save(self.worktray_path)
+
+    def run_workflow(self) -> None:
+        self.logger.info(f"************ Inicio del workflow {self.__class__.__name__} ************")
+        start_time = time.time()
+        indicadores = self.build_indicadores_df()
+        self.write_worktray(indicadores)
+        self.logger.info(f"Indicadores escritos en {self.worktray_path}: {len(indicadores)} filas")
+        self.logger.info(f"Tiempo total de ejecución: {time.time() - start_time:.2f} segundos")
+        self.logger.info(f"************ Termino del workflow {self.__class__.__name__} ************")
+
+
+if __name__ == "__main__":
+    ReporteWorktray().run_workflow()